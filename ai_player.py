@@ -1,13 +1,29 @@
-from grid import *
+import json
+import logging
+import os
+import time
+from rules import *
 from copy import deepcopy
+from bitboard import BOARD_SIZE, MAX_BOARD_SIZE, STANDARD, grid_geometry, grid_to_bitboards, iter_bits, bits_to_coords, neighbours, valid_moves_mask, move_flips, flips_mask, count_patterns
+from endgame import EndgameSolver, ENDGAME_EMPTIES
+from transposition import TranspositionTable, zobrist_hash, update_pattern_hash, S_KEYS, O_KEYS, FLIP_KEYS, SIDE_KEY, EXACT, LOWER, UPPER
+
+try:
+    import batch_eval
+except ImportError: # NumPy is optional, without it every leaf is evaluated on its own
+    batch_eval = None
+
+logger = logging.getLogger(__name__) # Best move and score of every search at DEBUG level
 
 # Utility Functions
 def copy_grid(grid):
     return [row[:] for row in grid]
 
-def apply_move(x, y, grid, player):
+def apply_move(x, y, grid, player, swappableTiles=None):
+    # swappableTiles is the move's entry of find_move_flips, found here when not given
     newGrid = copy_grid(grid)
-    swappableTiles = find_swappable_tiles(x, y, newGrid, player)
+    if swappableTiles is None:
+        swappableTiles = find_swappable_tiles(x, y, newGrid, player)
     
     # Apply the move to the grid and flip the swappable tiles
     for tile in swappableTiles:
@@ -17,11 +33,14 @@ def apply_move(x, y, grid, player):
 
 def is_terminal(grid):
     sSCore, oScore = calculate_score(grid)
-    return sSCore + oScore == 64
+    return sSCore + oScore == len(grid) * len(grid)
     
 def get_reward(grid, player, sPatternScore, oPatternScore):
     sScore, oScore = calculate_score(grid)
-    
+    return get_reward_from_counts(player, sScore, oScore, sPatternScore, oPatternScore)
+
+def get_reward_from_counts(player, sScore, oScore, sPatternScore, oPatternScore):
+    # Same as get_reward when the token counts are already known
     if player == 'O':
         playerScore = oPatternScore + oScore
         opponentScore = sPatternScore + sScore
@@ -36,6 +55,291 @@ def get_reward(grid, player, sPatternScore, oPatternScore):
     else:
         return 0
 
+# Static Positional Weights (standard board, see EvaluationTables for the other sizes)
+VALUE_TABLE = [
+    [100, -10,  11,   6,   6,  11, -10, 100],
+    [-10, -20,   1,   2,   2,   1, -20, -10],
+    [ 10,   1,   5,   4,   4,   5,   1,  10],
+    [  6,   2,   4,   2,   2,   4,   2,   6],
+    [  6,   2,   4,   2,   2,   4,   2,   6],
+    [ 10,   1,   5,   4,   4,   5,   1,  10],
+    [-10, -20,   1,   2,   2,   1, -20, -10],
+    [100, -10,  11,   6,   6,  11, -10, 100],
+]
+
+# Weights of the evaluation terms, in order: static value, token difference, frontier, mobility, corners, corner closeness, patterns
+EVAL_WEIGHTS = (50, 15, 30, 60, 40, 30, 60)
+
+# Tuned evaluation written by tune_weights.py, when the file exists its weights and value table replace the ones above
+# for every ComputerPlayer (and batch_eval)
+WEIGHTS_PATH = 'assets/eval_weights.json'
+
+def load_weights(path=WEIGHTS_PATH):
+    # Returns (weights, valueTable) of a weights file
+    with open(path) as weightsFile:
+        data = json.load(weightsFile)
+    weights = tuple(float(weight) for weight in data['weights'])
+    valueTable = [[int(value) for value in row] for row in data['valueTable']]
+    if len(weights) != len(EVAL_WEIGHTS) or len(valueTable) != BOARD_SIZE or any(len(row) != BOARD_SIZE for row in valueTable):
+        raise ValueError(f"{path}: expected {len(EVAL_WEIGHTS)} weights and a {BOARD_SIZE}x{BOARD_SIZE} value table")
+    return weights, valueTable
+
+if os.path.exists(WEIGHTS_PATH):
+    try:
+        EVAL_WEIGHTS, VALUE_TABLE = load_weights()
+        if batch_eval is not None:
+            batch_eval.set_value_table(VALUE_TABLE)
+    except (ValueError, KeyError, TypeError) as e:
+        logger.warning("Ignoring %s, using the default evaluation: %s", WEIGHTS_PATH, e)
+
+# Evaluation tables of one board size
+# The positional value of a cell is the VALUE_TABLE value of the 8x8 cell at the same distance from the nearest edges
+# (rows and columns counted separately), rings further in than the 8x8 board has get the values of its centre ring.
+# On the 8x8 board this gives back VALUE_TABLE itself.
+class EvaluationTables:
+    def __init__(self, size):
+        last = size - 1
+        ring = lambda index: min(index, last - index, 3)
+        self.valueTable = [[VALUE_TABLE[ring(x)][ring(y)] for y in range(size)] for x in range(size)]
+        self.valueBySquare = [value for row in self.valueTable for value in row] # valueTable indexed by bitboard square
+
+        # Corners and the cells next to them (rated negatively while the corner is empty), as coordinates for
+        # heuristic_evaluation and as bitboard masks for evaluate_position
+        self.corners = [(0, 0), (0, last), (last, 0), (last, last)]
+        self.adjacentCorners = [
+            [(0, 1), (1, 0), (1, 1)], # Adjacent to top-left corner
+            [(0, last - 1), (1, last - 1), (1, last)], # Adjacent to top-right corner
+            [(last - 1, 0), (last - 1, 1), (last, 1)], # Adjacent to bottom-left corner
+            [(last - 1, last - 1), (last - 1, last), (last, last - 1)], # Adjacent to bottom-right corner
+        ]
+        bit = lambda x, y: 1 << (x * size + y)
+        self.cornerMask = sum(bit(x, y) for x, y in self.corners)
+        self.cornerAdjacent = [(bit(*corner), sum(bit(x, y) for x, y in adjacent)) for corner, adjacent in zip(self.corners, self.adjacentCorners)]
+
+evaluationTables = {} # size -> EvaluationTables, built the first time a size is searched
+
+def evaluation_tables(size):
+    if size not in evaluationTables:
+        evaluationTables[size] = EvaluationTables(size)
+    return evaluationTables[size]
+
+MAX_PLY = MAX_BOARD_SIZE * MAX_BOARD_SIZE # Upper bound on search depth (never more moves left than cells), sizes the killer move table
+KILLER_BONUS = 1 << 30 # Killer moves are tried before any history score can reach them
+
+PARALLEL_MIN_DEPTH = 3 # Shallower root searches are faster than the round trip to the worker processes
+
+# The parts of Grid the search reads, so ComputerPlayer can search a position without the pygame Grid
+class BoardState:
+    def __init__(self, gridLogic, sPatternScore=0, oPatternScore=0):
+        self.gridLogic = gridLogic
+        self.sPatternScore = sPatternScore
+        self.oPatternScore = oPatternScore
+
+# Board the alpha-beta search plays its moves on in place
+# make_move applies a move and pushes what it changed on the undo stack, unmake_move pops it and restores the board,
+# so the search never copies the grid. The bitboards, pattern scores gained during the search, evaluation sums and Zobrist key are kept in sync.
+class SearchPosition:
+    def __init__(self, grid, sideToMove, sBaseScore=0, oBaseScore=0):
+        self.geometry = grid_geometry(grid) # Bitboard tables of the board size
+        self.tables = evaluation_tables(self.geometry.size)
+        self.sBits, self.oBits = grid_to_bitboards(grid)
+        self.sScore, self.oScore = 0, 0 # Pattern scores gained since the root
+        self.key = zobrist_hash(grid, sideToMove, 0, 0, sBaseScore, oBaseScore)
+        self.undoStack = []
+
+        # Sum of the positional values over each side's tokens, updated by the flipped squares only
+        valueBySquare = self.tables.valueBySquare
+        self.sValue = sum(valueBySquare[square] for square in iter_bits(self.sBits))
+        self.oValue = sum(valueBySquare[square] for square in iter_bits(self.oBits))
+
+    def valid_moves(self, player):
+        if player == 'S':
+            return bits_to_coords(valid_moves_mask(self.sBits, self.oBits, self.geometry), self.geometry)
+        return bits_to_coords(valid_moves_mask(self.oBits, self.sBits, self.geometry), self.geometry)
+
+    def move_flips(self, player):
+        # {(x, y): flips mask} of player's valid moves, the flips are passed back to make_move
+        if player == 'S':
+            return move_flips(self.sBits, self.oBits, self.geometry)
+        return move_flips(self.oBits, self.sBits, self.geometry)
+
+    def is_full(self):
+        return (self.sBits | self.oBits) == self.geometry.fullBoard
+
+    def empty_count(self):
+        return self.geometry.cells - (self.sBits | self.oBits).bit_count()
+
+    def token_counts(self):
+        return self.sBits.bit_count(), self.oBits.bit_count()
+
+    def make_move(self, x, y, player, flips=None):
+        # Places player's token on (x, y), flips the captured tokens and adds the patterns formed to player's score
+        # flips is the move's entry of move_flips, computed here when not given
+        geometry = self.geometry
+        valueBySquare = self.tables.valueBySquare
+        square = x * geometry.size + y
+        placed = 1 << square
+        oldKey = self.key
+
+        if player == 'S':
+            if flips is None:
+                flips = flips_mask(self.sBits, self.oBits, square, geometry)
+            self.sBits |= flips | placed
+            self.oBits ^= flips
+            key = oldKey ^ S_KEYS[square] ^ SIDE_KEY
+        else:
+            if flips is None:
+                flips = flips_mask(self.oBits, self.sBits, square, geometry)
+            self.oBits |= flips | placed
+            self.sBits ^= flips
+            key = oldKey ^ O_KEYS[square] ^ SIDE_KEY
+
+        flipValue = 0
+        remaining = flips
+        while remaining:
+            low = remaining & -remaining
+            flipped = low.bit_length() - 1
+            key ^= FLIP_KEYS[flipped]
+            flipValue += valueBySquare[flipped]
+            remaining ^= low
+
+        if player == 'S':
+            self.sValue += valueBySquare[square] + flipValue
+            self.oValue -= flipValue
+        else:
+            self.oValue += valueBySquare[square] + flipValue
+            self.sValue -= flipValue
+
+        patternScore = count_patterns(self.sBits, self.oBits, flips | placed, geometry)
+        if patternScore:
+            if player == 'S':
+                key = update_pattern_hash(key, 'S', self.sScore, self.sScore + patternScore)
+                self.sScore += patternScore
+            else:
+                key = update_pattern_hash(key, 'O', self.oScore, self.oScore + patternScore)
+                self.oScore += patternScore
+
+        self.key = key
+        self.undoStack.append((x, y, player, flips, patternScore, oldKey, flipValue))
+        return patternScore
+
+    def unmake_move(self):
+        # Takes back the last make_move
+        x, y, player, flips, patternScore, oldKey, flipValue = self.undoStack.pop()
+        square = x * self.geometry.size + y
+        placed = 1 << square
+        placedValue = self.tables.valueBySquare[square]
+
+        if player == 'S':
+            self.sBits ^= flips | placed
+            self.oBits |= flips
+            self.sScore -= patternScore
+            self.sValue -= placedValue + flipValue
+            self.oValue += flipValue
+        else:
+            self.oBits ^= flips | placed
+            self.sBits |= flips
+            self.oScore -= patternScore
+            self.oValue -= placedValue + flipValue
+            self.sValue += flipValue
+
+        self.key = oldKey
+
+    def pass_turn(self):
+        # A skipped turn only changes the side to move (calling it twice restores the key)
+        self.key ^= SIDE_KEY
+
+class SearchTimeout(Exception):
+    # Raised inside the search when the deadline of an iterative deepening search passes
+    pass
+
+class SearchCancelled(Exception):
+    # Raised inside the search when cancel_search() was called (e.g. the game was reset while the AI was thinking)
+    pass
+
+# Counters of one get_best_move/get_best_move_ab call, only collected when ComputerPlayer.collectStats is set
+# The search only pays a "stats is not None" check per node when they are off.
+# Nodes searched by parallel_search worker processes are not included, only the ones of this process.
+class SearchStats:
+    def __init__(self):
+        self.move = None
+        self.score = None
+        self.depth = 0 # Deepest completed iteration (the book's search depth for a book move)
+        self.fromBook = False # The move came from the opening book, nothing was searched
+        self.solved = False # The move came from the endgame solver, score is then the exact final margin
+        self.endgameNodes = 0
+        self.nodes = 0
+        self.plyNodes = [0] * (MAX_PLY + 1) # Nodes visited at each ply from the root
+        self.leafEvaluations = 0
+        self.terminalHits = 0 # Finished games reached by the search
+        self.expandedNodes = 0 # Nodes whose moves were generated and searched
+        self.movesGenerated = 0
+        self.cutoffs = 0
+        self.firstMoveCutoffs = 0 # Cutoffs caused by the first move searched, a measure of move ordering quality
+        self.ttProbes = 0
+        self.ttHits = 0
+        self.ttCutoffs = 0 # Nodes decided by a transposition table entry without searching
+        self.iterations = [] # (depth, nodes, seconds, move, score) of each completed iteration
+        self.setupSeconds = 0.0
+        self.searchSeconds = 0.0
+        self.evaluationSeconds = 0.0 # Part of searchSeconds spent in the evaluation function
+        self.totalSeconds = 0.0
+
+    def count_cutoff(self, moveIndex):
+        self.cutoffs += 1
+        if moveIndex == 0:
+            self.firstMoveCutoffs += 1
+
+    def cutoff_rate(self):
+        return self.cutoffs / self.expandedNodes if self.expandedNodes else 0.0
+
+    def first_move_cutoff_ratio(self):
+        return self.firstMoveCutoffs / self.cutoffs if self.cutoffs else 0.0
+
+    def tt_hit_rate(self):
+        return self.ttHits / self.ttProbes if self.ttProbes else 0.0
+
+    def branching_factor(self):
+        # Average number of moves at the nodes that were expanded
+        return self.movesGenerated / self.expandedNodes if self.expandedNodes else 0.0
+
+    def effective_branching_factor(self):
+        # Growth of the node count per extra ply: ratio of the last two iterations, or the depth-th root of the nodes searched
+        if len(self.iterations) >= 2 and self.iterations[-2][1]:
+            return self.iterations[-1][1] / self.iterations[-2][1]
+        return self.nodes ** (1 / self.depth) if self.depth else 0.0
+
+    def as_dict(self):
+        # Plain values only, ready for json.dumps or a metrics exporter
+        lastPly = max((ply for ply, nodes in enumerate(self.plyNodes) if nodes), default=0)
+        return {
+            'move': self.move,
+            'score': self.score,
+            'depth': self.depth,
+            'fromBook': self.fromBook,
+            'solved': self.solved,
+            'nodes': self.nodes,
+            'nodesPerPly': self.plyNodes[1:lastPly + 1],
+            'leafEvaluations': self.leafEvaluations,
+            'terminalHits': self.terminalHits,
+            'cutoffRate': self.cutoff_rate(),
+            'firstMoveCutoffRatio': self.first_move_cutoff_ratio(),
+            'ttHitRate': self.tt_hit_rate(),
+            'ttCutoffs': self.ttCutoffs,
+            'branchingFactor': self.branching_factor(),
+            'effectiveBranchingFactor': self.effective_branching_factor(),
+            'iterations': [
+                {'depth': depth, 'nodes': nodes, 'seconds': seconds, 'move': move, 'score': score}
+                for depth, nodes, seconds, move, score in self.iterations
+            ],
+            'seconds': {
+                'setup': self.setupSeconds,
+                'search': self.searchSeconds,
+                'evaluation': self.evaluationSeconds,
+                'total': self.totalSeconds,
+            },
+        }
+
 # For debugging purposes, print the grid in a readable format
 def print_grid(grid):
     for row in grid:
@@ -43,25 +347,61 @@ def print_grid(grid):
     print()
     
 class ComputerPlayer:
-    def __init__(self, player, maxDepth, gridClass):
+    def __init__(self, player, maxDepth, gridClass, ttSizeMb=16, timeLimitMs=None, workers=1, batchLeaves=False, weights=EVAL_WEIGHTS,
+                 collectStats=False, statsCallback=None, openingBook=None, endgameEmpties=ENDGAME_EMPTIES, endgameExact=True):
         self.player = player
         self.opponent = 'S' if player == 'O' else 'O'
         self.maxDepth = maxDepth
         self.gridClass = gridClass
+        self.transpositionTable = TranspositionTable(ttSizeMb) # Kept between moves, entries of older searches get replaced first
+
+        # Alpha-beta search limits: fixed maxDepth, or iterative deepening until timeLimitMs when it is set
+        self.timeLimitMs = timeLimitMs
+        self.searchDepth = maxDepth # Depth of the iteration currently being searched
+        self.completedDepth = 0 # Deepest fully searched iteration of the last timed search
+        self.deadline = None
+        self.cancelled = False # Set from another thread to stop the running search
+        self.cancelEvent = None # multiprocessing.Event checked the same way inside worker processes
+
+        # Root moves are split across this many processes (see parallel_search.py), 1 searches serially
+        self.workers = workers
+        self.ttSizeMb = ttSizeMb
+        self.nodes = 0 # Nodes expanded by the last alpha-beta search
+        self.batchLeaves = batchLeaves and batch_eval is not None # Evaluate the children of frontier nodes together (needs NumPy, 8x8 board only)
+        self.weights = tuple(weights)
+
+        # Search statistics: lastStats holds the SearchStats of the last search, statsCallback (if set) is called with it
+        self.collectStats = collectStats or statsCallback is not None
+        self.statsCallback = statsCallback
+        self.stats = None # SearchStats of the running search, None when not collecting
+        self.lastStats = None
+
+        self.openingBook = openingBook # opening_book.OpeningBook probed before searching, None to always search
+
+        # Positions with at most endgameEmpties empty squares are solved to the end of the game (0 turns it off),
+        # for the exact final margin or, with endgameExact off, only for win/draw/loss
+        self.endgameEmpties = endgameEmpties
+        self.endgameExact = endgameExact
+        self.reset_move_ordering()
         
     def get_best_move(self):
+        startTime = time.perf_counter()
         bestScore = float('-inf')
         bestMove = None
-        validMoves = find_valid_moves(self.gridClass.gridLogic, self.player)
+        moveFlips = find_move_flips(self.gridClass.gridLogic, self.player)
         testGrid = copy_grid(self.gridClass.gridLogic)
         
-        if not validMoves:
+        if not moveFlips:
+            self.lastStats = None
             return None
         
+        stats = self.start_stats()
+        searchStart = time.perf_counter()
+        
         # Iterate through all valid moves of the AI and evaluate them
-        for move in validMoves:
-            newGrid, flippedTokens = apply_move(move[0], move[1], testGrid, self.player)
-            patternScore = len(find_patterns(newGrid, flippedTokens))
+        for move, swappableTiles in moveFlips.items():
+            newGrid, flippedTokens = apply_move(move[0], move[1], testGrid, self.player, swappableTiles)
+            patternScore = count_new_patterns(newGrid, flippedTokens)
             sScore, oScore = 0, 0
             
             if self.player == 'O':
@@ -76,31 +416,44 @@ class ComputerPlayer:
                 bestScore = score
                 bestMove = move
         
-        print(f"Best Move: {bestMove}, Score: {bestScore}") # For debugging
+        self.finish_stats(stats, bestMove, bestScore, self.maxDepth, startTime, searchStart)
         return bestMove
     
     def min_score(self, grid, depth, sScore, oScore):
+        stats = self.stats
+        if stats is not None:
+            stats.plyNodes[depth] += 1
+        
         # Check if the game is over or if the maximum depth has been reached
         if is_terminal(grid):
+            if stats is not None:
+                stats.terminalHits += 1
             return get_reward(grid, self.player, sScore + self.gridClass.sPatternScore, oScore + self.gridClass.oPatternScore)
         
         if depth >= self.maxDepth:
+            if stats is not None:
+                return self.timed_evaluation(stats, self.heuristic_evaluation, grid, self.player, sScore, oScore)
             return self.heuristic_evaluation(grid, self.player, sScore, oScore)
         
-        validMoves = find_valid_moves(grid, self.opponent)
+        moveFlips = find_move_flips(grid, self.opponent)
         
-        if not validMoves: # Opponent's turn is skipped
+        if not moveFlips: # Opponent's turn is skipped
             if not find_valid_moves(grid, self.player): # Both turns are skipped, game over
+                if stats is not None:
+                    stats.terminalHits += 1
                 return get_reward(grid, self.player, sScore + self.gridClass.sPatternScore, oScore + self.gridClass.oPatternScore) # Identify the winner
             else: 
                 return self.max_score(grid, depth + 1, sScore, oScore) # AI's turn
             
         minScore = float('inf')
+        if stats is not None:
+            stats.expandedNodes += 1
+            stats.movesGenerated += len(moveFlips)
         
         # Iterate through all valid moves of the opponent and evaluate them
-        for move in validMoves:
-            newGrid, flippedTokens = apply_move(move[0], move[1], grid, self.opponent)
-            patternScore = len(find_patterns(newGrid, flippedTokens))
+        for move, swappableTiles in moveFlips.items():
+            newGrid, flippedTokens = apply_move(move[0], move[1], grid, self.opponent, swappableTiles)
+            patternScore = count_new_patterns(newGrid, flippedTokens)
             sNewScore, oNewScore = sScore, oScore
             
             if self.opponent == 'S':
@@ -114,27 +467,40 @@ class ComputerPlayer:
         return minScore
             
     def max_score(self, grid, depth, sScore, oScore):
+        stats = self.stats
+        if stats is not None:
+            stats.plyNodes[depth] += 1
+        
         # Check if the game is over or if the maximum depth has been reached
         if is_terminal(grid):
+            if stats is not None:
+                stats.terminalHits += 1
             return get_reward(grid, self.player, sScore + self.gridClass.sPatternScore, oScore + self.gridClass.oPatternScore)
         
         if depth >= self.maxDepth:
+            if stats is not None:
+                return self.timed_evaluation(stats, self.heuristic_evaluation, grid, self.player, sScore, oScore)
             return self.heuristic_evaluation(grid, self.player, sScore, oScore)
         
-        validMoves = find_valid_moves(grid, self.player)
+        moveFlips = find_move_flips(grid, self.player)
         
-        if not validMoves: # AI's turn is skipped
+        if not moveFlips: # AI's turn is skipped
             if not find_valid_moves(grid, self.opponent): # Both turns are skipped, game over
+                if stats is not None:
+                    stats.terminalHits += 1
                 return get_reward(grid, self.player, sScore + self.gridClass.sPatternScore, oScore + self.gridClass.oPatternScore) # Identify the winner
             else: 
                 return self.min_score(grid, depth + 1, sScore, oScore)
             
         maxScore = float('-inf')
+        if stats is not None:
+            stats.expandedNodes += 1
+            stats.movesGenerated += len(moveFlips)
         
         # Iterate through all valid moves of the AI and evaluate them
-        for move in validMoves:
-            newGrid, flippedTokens = apply_move(move[0], move[1], grid, self.player)
-            patternScore = len(find_patterns(newGrid, flippedTokens))
+        for move, swappableTiles in moveFlips.items():
+            newGrid, flippedTokens = apply_move(move[0], move[1], grid, self.player, swappableTiles)
+            patternScore = count_new_patterns(newGrid, flippedTokens)
             sNewScore, oNewScore = sScore, oScore
             
             if self.player == 'O':
@@ -149,30 +515,18 @@ class ComputerPlayer:
             
     def heuristic_evaluation(self, grid, player, sScore, oScore):
         opponent = 'S' if player == 'O' else 'O'
-        
-        # Static Positional Weights
-        valueTable = [
-            [100, -10,  11,   6,   6,  11, -10, 100],
-            [-10, -20,   1,   2,   2,   1, -20, -10],
-            [ 10,   1,   5,   4,   4,   5,   1,  10],
-            [  6,   2,   4,   2,   2,   4,   2,   6],
-            [  6,   2,   4,   2,   2,   4,   2,   6],
-            [ 10,   1,   5,   4,   4,   5,   1,  10],
-            [-10, -20,   1,   2,   2,   1, -20, -10],
-            [100, -10,  11,   6,   6,  11, -10, 100],
-        ]
-        
-        # Directions (W, NW, N, NE, E, SE, S, SW)
-        rx = [-1, -1,  0,  1,  1,  1,  0, -1]
-        ry = [ 0,  1,  1,  1,  0, -1, -1, -1]
+        size = len(grid)
+        tables = evaluation_tables(size)
+        valueTable = tables.valueTable
+        neighbourCoords = grid_geometry(grid).neighbourCoords # Cells adjacent to each square, precomputed per board size
 
         staticValue = 0 
         ownTokens = oppTokens = 0 # Number of tokens on the board
         ownFront = oppFront = 0 # Frontier Tokens (tokens adjacent to empty spaces). They are vulnerable to being flipped.
         
-        # Static Board Evaluation (-456 to +456)
-        for row in range(8):
-            for col in range(8):
+        # Static Board Evaluation (-456 to +456 on the 8x8 board)
+        for row in range(size):
+            for col in range(size):
                 cell = grid[row][col]
                 
                 if cell == player:
@@ -183,20 +537,15 @@ class ComputerPlayer:
                     oppTokens += 1
 
         # Calculate the number of frontier tokens for stability evaluation
-                # If cell is not empty, check the adjacent cells
+                # If cell is not empty, check the adjacent cells (a token only counts once as a frontier token)
                 if cell != '-': 
-                    ownFlag = oppFlag = True # Flags to ensure we only count a token once as a frontier token
-                    
-                    # Loop through all 8 directions
-                    for k in range(8):
-                        x, y = row + rx[k], col + ry[k]
-                        if 0 <= x < 8 and 0 <= y < 8 and grid[x][y] == '-':
-                            if ownFlag and cell == player:
+                    for x, y in neighbourCoords[row * size + col]:
+                        if grid[x][y] == '-':
+                            if cell == player:
                                 ownFront += 1
-                                ownFlag = False
-                            if oppFlag and cell == opponent:
+                            else:
                                 oppFront += 1
-                                oppFlag = False
+                            break
 
         # Token Difference Evaluation (-100 to +100)
         tokenDiff = 0 if ownTokens + oppTokens == 0 else 100 * (ownTokens - oppTokens) / (ownTokens + oppTokens)
@@ -210,7 +559,7 @@ class ComputerPlayer:
         mobility = 0 if ownValidMoves + oppValidMoves == 0 else 100 * (ownValidMoves - oppValidMoves) / (ownValidMoves + oppValidMoves)
 
         # Corners Captured Evaluation (-100 to +100)
-        corners = [(0, 0), (0, 7), (7, 0), (7, 7)]
+        corners = tables.corners
         ownCorner = oppCorner = 0
         for x, y in corners:
             if grid[x][y] == player:
@@ -220,23 +569,17 @@ class ComputerPlayer:
         cornerScore = 25 * (ownCorner - oppCorner)
         
         # Corner Closeness Evaluation (-150 to +150): The squares adjacent to the empty corner squares are rated negatively.
-        adjacentCorners = [
-            [(0, 1), (1, 0), (1, 1)], # Adjacent to top-left corner
-            [(0, 6), (1, 6), (1, 7)], # Adjacent to top-right corner
-            [(6, 0), (6, 1), (7, 1)], # Adjacent to bottom-left corner
-            [(6, 6), (6, 7), (7, 6)], # Adjacent to bottom-right corner
-        ]
+        adjacentCorners = tables.adjacentCorners
         ownAdj = oppAdj = 0
         
         # Check each adjacent square for each corner
         for cornerNum, (i, j) in enumerate(corners):
             if grid[i][j] == '-':  # If the corner is empty
                 for x, y in adjacentCorners[cornerNum]:
-                    if 0 <= x < 8 and 0 <= y < 8:
-                        if grid[x][y] == player:
-                            ownAdj += 1
-                        elif grid[x][y] == opponent:
-                            oppAdj += 1
+                    if grid[x][y] == player:
+                        ownAdj += 1
+                    elif grid[x][y] == opponent:
+                        oppAdj += 1
                             
         cornerAdj = 12.5 * (oppAdj - ownAdj) 
         
@@ -245,7 +588,7 @@ class ComputerPlayer:
         oppPatternScore = sScore if player == 'O' else oScore
         patternScoreDiff = 0 if ownPatternScore + oppPatternScore == 0 else 100 * (ownPatternScore - oppPatternScore) / (ownPatternScore + oppPatternScore)
         
-        # Score Range: -52300 to +52300
+        # Score Range (default EVAL_WEIGHTS, 8x8 board): -52300 to +52300
         # staticValue: -456 to +456 => -22800 to +22800
         # tokenDiff: -100 to +100 => -1500 to +1500
         # frontier: -100 to +100 => -3000 to +3000
@@ -253,7 +596,8 @@ class ComputerPlayer:
         # cornerScore: -100 to +100 => -4000 to +4000
         # cornerAdj: -150 to +150 => -4500 to +4500
         # patternScoreDiff: -100 to +100 => -6000 to +6000
-        score = (50 * staticValue) + (15 * tokenDiff) + (30 * frontier) + (60 * mobility) + (40 * cornerScore) + (30 * cornerAdj) + (60 * patternScoreDiff)
+        wStatic, wTokens, wFrontier, wMobility, wCorners, wCornerAdj, wPatterns = self.weights
+        score = (wStatic * staticValue) + (wTokens * tokenDiff) + (wFrontier * frontier) + (wMobility * mobility) + (wCorners * cornerScore) + (wCornerAdj * cornerAdj) + (wPatterns * patternScoreDiff)
         
         return score
     
@@ -262,108 +606,485 @@ class ComputerPlayer:
 
 
 
+    def evaluate_position(self, position):
+        # heuristic_evaluation for a SearchPosition, same terms, weights and result
+        # The static value comes from the sums kept up to date by make/unmake, the other terms are a few mask operations
+        if self.player == 'S':
+            own, opp = position.sBits, position.oBits
+            staticValue = position.sValue - position.oValue
+            ownPatternScore, oppPatternScore = position.sScore, position.oScore
+        else:
+            own, opp = position.oBits, position.sBits
+            staticValue = position.oValue - position.sValue
+            ownPatternScore, oppPatternScore = position.oScore, position.sScore
+        geometry, tables = position.geometry, position.tables
+        empty = ~(own | opp) & geometry.fullBoard
+
+        ownTokens, oppTokens = own.bit_count(), opp.bit_count()
+        tokenDiff = 0 if ownTokens + oppTokens == 0 else 100 * (ownTokens - oppTokens) / (ownTokens + oppTokens)
+
+        # Frontier tokens are the ones next to an empty cell
+        nextToEmpty = neighbours(empty, geometry)
+        ownFront, oppFront = (own & nextToEmpty).bit_count(), (opp & nextToEmpty).bit_count()
+        frontier = 0 if ownFront + oppFront == 0 else 100 * (oppFront - ownFront) / (ownFront + oppFront)
+
+        ownValidMoves, oppValidMoves = valid_moves_mask(own, opp, geometry).bit_count(), valid_moves_mask(opp, own, geometry).bit_count()
+        mobility = 0 if ownValidMoves + oppValidMoves == 0 else 100 * (ownValidMoves - oppValidMoves) / (ownValidMoves + oppValidMoves)
+
+        cornerMask = tables.cornerMask
+        cornerScore = 25 * ((own & cornerMask).bit_count() - (opp & cornerMask).bit_count())
+
+        adjacentMask = 0
+        for corner, adjacent in tables.cornerAdjacent:
+            if empty & corner:
+                adjacentMask |= adjacent
+        cornerAdj = 12.5 * ((opp & adjacentMask).bit_count() - (own & adjacentMask).bit_count())
+
+        patternScoreDiff = 0 if ownPatternScore + oppPatternScore == 0 else 100 * (ownPatternScore - oppPatternScore) / (ownPatternScore + oppPatternScore)
+
+        wStatic, wTokens, wFrontier, wMobility, wCorners, wCornerAdj, wPatterns = self.weights
+        return (wStatic * staticValue) + (wTokens * tokenDiff) + (wFrontier * frontier) + (wMobility * mobility) + (wCorners * cornerScore) + (wCornerAdj * cornerAdj) + (wPatterns * patternScoreDiff)
+
 ######################################################_ALPHA-BETA PRUNING_#######################################################
     # Alpha-Beta Pruning Version (if allowed)
     def get_best_move_ab(self):
-        bestScore = float('-inf')
-        bestMove = None
-        alpha = float('-inf')
-        beta = float('inf')
-
+        startTime = time.perf_counter()
         validMoves = find_valid_moves(self.gridClass.gridLogic, self.player)
-        testGrid = copy_grid(self.gridClass.gridLogic)
 
         if not validMoves:
+            self.lastStats = None
             return None
 
-        for move in validMoves:
-            newGrid, flippedTokens = apply_move(move[0], move[1], testGrid, self.player)
-            patternScore = len(find_patterns(newGrid, flippedTokens))
-            sScore, oScore = 0, 0
+        stats = self.start_stats()
+        self.nodes = 0
+        if self.openingBook is not None:
+            bookEntry = self.openingBook.probe(self.gridClass.gridLogic, self.player, self.gridClass.sPatternScore, self.gridClass.oPatternScore)
+            if bookEntry is not None and bookEntry[0] in validMoves: # Also guards against a key collision
+                bookMove, bookDepth, bookScore = bookEntry
+                if stats is not None:
+                    stats.fromBook = True
+                self.finish_stats(stats, bookMove, bookScore, bookDepth, startTime, time.perf_counter())
+                return bookMove
 
-            if self.player == 'O':
-                oScore += patternScore
-            else:
-                sScore += patternScore
+        # Root key includes the pattern scores so far, terminal rewards depend on them
+        table = self.transpositionTable
+        ttProbes, ttHits = table.probes, table.hits
+        self.reset_move_ordering(len(self.gridClass.gridLogic))
+        table.new_search()
+        position = SearchPosition(self.gridClass.gridLogic, self.player, self.gridClass.sPatternScore, self.gridClass.oPatternScore)
+        rootEntry = table.probe(position.key)
+        firstMove = rootEntry[3] if rootEntry else None
+        searchStart = time.perf_counter()
 
-            score = self.min_score_ab(newGrid, 1, sScore, oScore, alpha, beta)
-            if score > bestScore:
-                bestScore = score
-                bestMove = move
+        emptyCells = position.empty_count()
 
-            alpha = max(alpha, bestScore)
+        try:
+            if emptyCells <= self.endgameEmpties:
+                bestMove, bestScore, depth = self.solve_endgame(position, validMoves, firstMove, emptyCells)
+            elif self.timeLimitMs is None:
+                bestMove, bestScore = self.search_root(position, validMoves, self.maxDepth, firstMove)
+                depth = self.maxDepth
+            else:
+                bestMove, bestScore = self.iterative_deepening(position, validMoves, firstMove)
+                depth = self.completedDepth
+        except SearchCancelled:
+            self.stats = None
+            return None
 
-        print(f"Best Move: {bestMove}, Score: {bestScore}")
+        if stats is not None:
+            stats.ttProbes, stats.ttHits = table.probes - ttProbes, table.hits - ttHits
+        self.finish_stats(stats, bestMove, bestScore, depth, startTime, searchStart)
         return bestMove
 
+    def get_best_move_with_stats(self):
+        # get_best_move_ab and the SearchStats of that search, collected even when collectStats is off
+        collectStats = self.collectStats
+        self.collectStats = True
+        try:
+            return self.get_best_move_ab(), self.lastStats
+        finally:
+            self.collectStats = collectStats
 
-    def min_score_ab(self, grid, depth, sScore, oScore, alpha, beta):
-        if is_terminal(grid):
-            return get_reward(grid, self.player, sScore + self.gridClass.sPatternScore, oScore + self.gridClass.oPatternScore)
+    def start_stats(self):
+        # Returns the SearchStats the search should fill in, None when statistics are off
+        self.lastStats = None
+        self.stats = SearchStats() if self.collectStats else None
+        return self.stats
 
-        if depth >= self.maxDepth:
-            return self.heuristic_evaluation(grid, self.player, sScore, oScore)
+    def finish_stats(self, stats, bestMove, bestScore, depth, startTime, searchStart):
+        logger.debug("Best Move: %s, Score: %s", bestMove, bestScore)
+        if stats is None:
+            return
 
-        validMoves = find_valid_moves(grid, self.opponent)
+        endTime = time.perf_counter()
+        stats.move, stats.score, stats.depth = bestMove, bestScore, depth
+        stats.nodes = sum(stats.plyNodes) + stats.endgameNodes
+        stats.setupSeconds = searchStart - startTime
+        stats.searchSeconds = endTime - searchStart
+        stats.totalSeconds = endTime - startTime
 
-        if not validMoves:
-            if not find_valid_moves(grid, self.player):
-                return get_reward(grid, self.player, sScore + self.gridClass.sPatternScore, oScore + self.gridClass.oPatternScore)
+        self.stats = None
+        self.lastStats = stats
+        if self.statsCallback is not None:
+            self.statsCallback(stats)
+
+    def timed_evaluation(self, stats, evaluate, *args):
+        # evaluate(*args), counted and timed in stats
+        start = time.perf_counter()
+        score = evaluate(*args)
+        stats.evaluationSeconds += time.perf_counter() - start
+        stats.leafEvaluations += 1
+        return score
+
+    def solve_endgame(self, position, validMoves, firstMove, emptyCells):
+        # Returns (best move, final margin, depth) from the endgame solver
+        # A timed search gives the solver half its time, if that is not enough the rest goes to iterative deepening
+        if self.player == 'S':
+            own, opp = position.sBits, position.oBits
+            patternDiff = self.gridClass.sPatternScore - self.gridClass.oPatternScore
+        else:
+            own, opp = position.oBits, position.sBits
+            patternDiff = self.gridClass.oPatternScore - self.gridClass.sPatternScore
+
+        solver = EndgameSolver(self.check_stop, position.geometry)
+        if self.timeLimitMs is not None:
+            self.deadline = time.perf_counter() + self.timeLimitMs / 2000
+
+        try:
+            bestMove, bestScore = solver.solve(own, opp, self.player == 'S', patternDiff, self.endgameExact)
+        except SearchTimeout:
+            self.deadline = None
+            bestMove, bestScore = self.iterative_deepening(position, validMoves, firstMove, self.timeLimitMs / 2)
+            return bestMove, bestScore, self.completedDepth
+        finally:
+            self.deadline = None
+            self.nodes += solver.nodes
+            if self.stats is not None:
+                self.stats.endgameNodes += solver.nodes
+
+        if self.stats is not None:
+            self.stats.solved = True
+        return bestMove, bestScore, emptyCells
+
+    def check_stop(self):
+        # Same cancel and deadline checks the alpha-beta search makes at every node
+        if self.cancelled or (self.cancelEvent is not None and self.cancelEvent.is_set()):
+            raise SearchCancelled
+        if self.deadline is not None and time.perf_counter() >= self.deadline:
+            raise SearchTimeout
+
+    def cancel_search(self):
+        # Can be called from any thread, the search stops at the next node it expands
+        self.cancelled = True
+
+    def iterative_deepening(self, position, validMoves, firstMove, timeLimitMs=None):
+        # Anytime search: deepen one ply at a time until the deadline, keeping the result of the deepest completed iteration
+        # Depth 1 always runs to completion so there is a move to return even with a tiny time limit
+        startTime = time.perf_counter()
+        emptyCells = position.empty_count()
+        bestMove, bestScore = self.search_root(position, validMoves, 1, firstMove)
+        self.completedDepth = 1
+        self.deadline = startTime + (timeLimitMs or self.timeLimitMs) / 1000
+
+        try:
+            for depth in range(2, emptyCells + 1): # Deeper than the number of empty cells only repeats the same search
+                if time.perf_counter() >= self.deadline:
+                    break
+                bestMove, bestScore = self.search_root(position, validMoves, depth, bestMove)
+                self.completedDepth = depth
+        except SearchTimeout:
+            pass # Keep the previous iteration's result, the interrupted one is incomplete
+        finally:
+            self.deadline = None
+
+        return bestMove, bestScore
+
+    def search_root(self, position, validMoves, depth, firstMove):
+        # Searches every root move to the given depth, firstMove (if valid) is searched first
+        self.searchDepth = depth
+        stats = self.stats
+        if stats is not None:
+            iterationStart, iterationNodes = time.perf_counter(), self.nodes
+
+        if self.workers > 1 and depth >= PARALLEL_MIN_DEPTH:
+            from parallel_search import parallel_search_root # Imported here, parallel_search imports this module
+            bestMove, bestScore = parallel_search_root(self, self.gridClass.gridLogic, validMoves, depth, firstMove)
+        else:
+            bestScore = float('-inf')
+            bestMove = None
+            alpha = float('-inf')
+            beta = float('inf')
+
+            for move in self.order_by_tt_move(validMoves[:], firstMove):
+                score = self.search_root_move(position, move, alpha, beta)
+                if score > bestScore:
+                    bestScore = score
+                    bestMove = move
+
+                alpha = max(alpha, bestScore)
+
+        self.transpositionTable.store(position.key, depth, EXACT, bestScore, bestMove)
+        if stats is not None:
+            stats.iterations.append((depth, self.nodes - iterationNodes, time.perf_counter() - iterationStart, bestMove, bestScore))
+        return bestMove, bestScore
+
+    def search_root_move(self, position, move, alpha, beta):
+        # Score of a single root move searched to self.searchDepth within (alpha, beta)
+        position.make_move(move[0], move[1], self.player)
+        try:
+            return self.min_score_ab(position, 1, alpha, beta)
+        finally:
+            position.unmake_move() # Also when the search is cancelled or times out, the position is reused
+
+    def reset_move_ordering(self, size=BOARD_SIZE):
+        # Killer moves (two per ply) and history scores (per side and cell) only live for one get_best_move_ab call
+        self.killers = [[None, None] for _ in range(MAX_PLY + 1)]
+        self.history = {'S': [[0] * size for _ in range(size)], 'O': [[0] * size for _ in range(size)]}
+        self.valueTable = evaluation_tables(size).valueTable # Positional values break history ties
+
+    def order_moves(self, validMoves, player, depth, ttMove):
+        # Most promising moves first: transposition table move, killer moves of this ply, then by history score and positional value
+        killers = self.killers[depth]
+        history = self.history[player]
+        valueTable = self.valueTable
+
+        def priority(move):
+            x, y = move
+            score = history[x][y] + valueTable[x][y]
+            if move == killers[0] or move == killers[1]:
+                score += KILLER_BONUS
+            if move == ttMove:
+                score += 2 * KILLER_BONUS
+            return score
+
+        validMoves.sort(key=priority, reverse=True)
+        return validMoves
+
+    def record_cutoff(self, move, player, depth):
+        # move refuted the previous move, remember it for sibling nodes and weight it by the remaining depth
+        killers = self.killers[depth]
+        if killers[0] != move:
+            killers[1] = killers[0]
+            killers[0] = move
+
+        remainingDepth = self.searchDepth - depth
+        self.history[player][move[0]][move[1]] += remainingDepth * remainingDepth
+
+    def order_by_tt_move(self, validMoves, ttMove):
+        # Search the best move of a previous visit first, it is the most likely to cause a cutoff
+        if ttMove is not None and ttMove in validMoves:
+            validMoves.remove(ttMove)
+            validMoves.insert(0, ttMove)
+        return validMoves
+
+    def probe_tt(self, key, remainingDepth, alpha, beta):
+        # Returns (score, ttMove), score is None unless the stored entry is deep enough to decide this node
+        entry = self.transpositionTable.probe(key)
+        if entry is None:
+            return None, None
+
+        depth, bound, score, ttMove = entry
+        if depth >= remainingDepth:
+            if bound == EXACT or (bound == LOWER and score >= beta) or (bound == UPPER and score <= alpha):
+                return score, ttMove
+
+        return None, ttMove
+
+    def store_tt(self, key, remainingDepth, score, alpha, beta, bestMove):
+        # alpha and beta are the window the node was searched with
+        if score <= alpha:
+            bound = UPPER
+        elif score >= beta:
+            bound = LOWER
+        else:
+            bound = EXACT
+        self.transpositionTable.store(key, remainingDepth, bound, score, bestMove)
+
+    def terminal_reward(self, position):
+        if self.stats is not None:
+            self.stats.terminalHits += 1
+        sScore, oScore = position.token_counts()
+        return get_reward_from_counts(self.player, sScore, oScore, position.sScore + self.gridClass.sPatternScore, position.oScore + self.gridClass.oPatternScore)
+
+    def evaluate_children(self, position, moves, moveFlips, player, depth):
+        # Scores of every child of a node just above the leaves, the non-terminal ones evaluated in one NumPy batch
+        scores = [None] * len(moves)
+        batchIndices, ownBits, oppBits, ownPatternScores, oppPatternScores = [], [], [], [], []
+
+        for index, move in enumerate(moves):
+            position.make_move(move[0], move[1], player, moveFlips[move])
+            if position.is_full():
+                scores[index] = self.terminal_reward(position)
             else:
-                return self.max_score_ab(grid, depth + 1, sScore, oScore, alpha, beta)
+                batchIndices.append(index)
+                if self.player == 'S':
+                    own, opp, ownPatternScore, oppPatternScore = position.sBits, position.oBits, position.sScore, position.oScore
+                else:
+                    own, opp, ownPatternScore, oppPatternScore = position.oBits, position.sBits, position.oScore, position.sScore
+                ownBits.append(own)
+                oppBits.append(opp)
+                ownPatternScores.append(ownPatternScore)
+                oppPatternScores.append(oppPatternScore)
+            position.unmake_move()
+
+        self.nodes += len(moves)
+        stats = self.stats
+        if stats is not None:
+            stats.plyNodes[depth + 1] += len(moves)
+            stats.leafEvaluations += len(batchIndices)
+            start = time.perf_counter()
+
+        if batchIndices:
+            boards = batch_eval.bitboards_to_boards(ownBits, oppBits)
+            for index, score in zip(batchIndices, batch_eval.evaluate_boards(boards, ownPatternScores, oppPatternScores, self.weights).tolist()):
+                scores[index] = score
+
+        if stats is not None:
+            stats.evaluationSeconds += time.perf_counter() - start
+
+        return scores
 
+    def min_score_ab(self, position, depth, alpha, beta):
+        self.nodes += 1
+        stats = self.stats
+        if stats is not None:
+            stats.plyNodes[depth] += 1
+
+        if position.is_full():
+            return self.terminal_reward(position)
+
+        if depth >= self.searchDepth:
+            if stats is not None:
+                return self.timed_evaluation(stats, self.evaluate_position, position)
+            return self.evaluate_position(position)
+
+        if self.cancelled or (self.cancelEvent is not None and self.cancelEvent.is_set()):
+            raise SearchCancelled
+        if self.deadline is not None and time.perf_counter() >= self.deadline:
+            raise SearchTimeout
+
+        remainingDepth = self.searchDepth - depth
+        key = position.key
+        ttScore, ttMove = self.probe_tt(key, remainingDepth, alpha, beta)
+        if ttScore is not None:
+            if stats is not None:
+                stats.ttCutoffs += 1
+            return ttScore
+
+        moveFlips = position.move_flips(self.opponent)
+
+        if not moveFlips:
+            if not position.valid_moves(self.player):
+                return self.terminal_reward(position)
+            else:
+                position.pass_turn()
+                try:
+                    return self.max_score_ab(position, depth + 1, alpha, beta)
+                finally:
+                    position.pass_turn()
+
+        alphaOrig, betaOrig = alpha, beta
         minScore = float('inf')
-        for move in validMoves:
-            newGrid, flippedTokens = apply_move(move[0], move[1], grid, self.opponent)
-            patternScore = len(find_patterns(newGrid, flippedTokens))
-            sNewScore, oNewScore = sScore, oScore
+        bestMove = None
+        validMoves = self.order_moves(list(moveFlips), self.opponent, depth, ttMove)
+        if stats is not None:
+            stats.expandedNodes += 1
+            stats.movesGenerated += len(validMoves)
+        leafScores = self.evaluate_children(position, validMoves, moveFlips, self.opponent, depth) if self.batchLeaves and depth + 1 == self.searchDepth and position.geometry is STANDARD else None
 
-            if self.opponent == 'S':
-                sNewScore += patternScore
+        for index, move in enumerate(validMoves):
+            if leafScores is not None:
+                score = leafScores[index]
             else:
-                oNewScore += patternScore
+                position.make_move(move[0], move[1], self.opponent, moveFlips[move])
+                try:
+                    score = self.max_score_ab(position, depth + 1, alpha, beta)
+                finally:
+                    position.unmake_move()
 
-            score = self.max_score_ab(newGrid, depth + 1, sNewScore, oNewScore, alpha, beta)
-            minScore = min(minScore, score)
+            if score < minScore:
+                minScore = score
+                bestMove = move
 
             if minScore <= alpha:
+                self.record_cutoff(move, self.opponent, depth)
+                if stats is not None:
+                    stats.count_cutoff(index)
                 break  # Max won't allow this move
             beta = min(beta, minScore)
 
+        self.store_tt(key, remainingDepth, minScore, alphaOrig, betaOrig, bestMove)
         return minScore
 
 
-    def max_score_ab(self, grid, depth, sScore, oScore, alpha, beta):
-        if is_terminal(grid):
-            return get_reward(grid, self.player, sScore + self.gridClass.sPatternScore, oScore + self.gridClass.oPatternScore)
+    def max_score_ab(self, position, depth, alpha, beta):
+        self.nodes += 1
+        stats = self.stats
+        if stats is not None:
+            stats.plyNodes[depth] += 1
 
-        if depth >= self.maxDepth:
-            return self.heuristic_evaluation(grid, self.player, sScore, oScore)
+        if position.is_full():
+            return self.terminal_reward(position)
 
-        validMoves = find_valid_moves(grid, self.player)
+        if depth >= self.searchDepth:
+            if stats is not None:
+                return self.timed_evaluation(stats, self.evaluate_position, position)
+            return self.evaluate_position(position)
 
-        if not validMoves:
-            if not find_valid_moves(grid, self.opponent):
-                return get_reward(grid, self.player, sScore + self.gridClass.sPatternScore, oScore + self.gridClass.oPatternScore)
+        if self.cancelled or (self.cancelEvent is not None and self.cancelEvent.is_set()):
+            raise SearchCancelled
+        if self.deadline is not None and time.perf_counter() >= self.deadline:
+            raise SearchTimeout
+
+        remainingDepth = self.searchDepth - depth
+        key = position.key
+        ttScore, ttMove = self.probe_tt(key, remainingDepth, alpha, beta)
+        if ttScore is not None:
+            if stats is not None:
+                stats.ttCutoffs += 1
+            return ttScore
+
+        moveFlips = position.move_flips(self.player)
+
+        if not moveFlips:
+            if not position.valid_moves(self.opponent):
+                return self.terminal_reward(position)
             else:
-                return self.min_score_ab(grid, depth + 1, sScore, oScore, alpha, beta)
+                position.pass_turn()
+                try:
+                    return self.min_score_ab(position, depth + 1, alpha, beta)
+                finally:
+                    position.pass_turn()
 
+        alphaOrig, betaOrig = alpha, beta
         maxScore = float('-inf')
-        for move in validMoves:
-            newGrid, flippedTokens = apply_move(move[0], move[1], grid, self.player)
-            patternScore = len(find_patterns(newGrid, flippedTokens))
-            sNewScore, oNewScore = sScore, oScore
+        bestMove = None
+        validMoves = self.order_moves(list(moveFlips), self.player, depth, ttMove)
+        if stats is not None:
+            stats.expandedNodes += 1
+            stats.movesGenerated += len(validMoves)
+        leafScores = self.evaluate_children(position, validMoves, moveFlips, self.player, depth) if self.batchLeaves and depth + 1 == self.searchDepth and position.geometry is STANDARD else None
 
-            if self.player == 'O':
-                oNewScore += patternScore
+        for index, move in enumerate(validMoves):
+            if leafScores is not None:
+                score = leafScores[index]
             else:
-                sNewScore += patternScore
+                position.make_move(move[0], move[1], self.player, moveFlips[move])
+                try:
+                    score = self.min_score_ab(position, depth + 1, alpha, beta)
+                finally:
+                    position.unmake_move()
 
-            score = self.min_score_ab(newGrid, depth + 1, sNewScore, oNewScore, alpha, beta)
-            maxScore = max(maxScore, score)
+            if score > maxScore:
+                maxScore = score
+                bestMove = move
 
             if maxScore >= beta:
+                self.record_cutoff(move, self.player, depth)
+                if stats is not None:
+                    stats.count_cutoff(index)
                 break  # Min won't allow this move
             alpha = max(alpha, maxScore)
 
+        self.store_tt(key, remainingDepth, maxScore, alphaOrig, betaOrig, bestMove)
         return maxScore
@@ -0,0 +1,32 @@
+import threading
+
+# Runs a ComputerPlayer search on a background thread so the game loop keeps pumping events and animating while the AI thinks
+class AISearchWorker:
+    def __init__(self, computerPlayer):
+        self.computerPlayer = computerPlayer
+        self.computerPlayer.cancelled = False
+        self.bestMove = None
+        self.error = None
+        self.done = False
+
+        self.thread = threading.Thread(target=self.search, name='FlipSOS-AI', daemon=True)
+        self.thread.start()
+
+    def search(self):
+        try:
+            self.bestMove = self.computerPlayer.get_best_move_ab()
+        except Exception as e:
+            self.error = e # Re-raised on the main thread by poll()
+        finally:
+            self.done = True
+
+    def poll(self):
+        # Returns True once the search has finished, bestMove then holds the result (None if there is no valid move)
+        if self.done and self.error is not None:
+            raise self.error
+        return self.done
+
+    def cancel(self, timeout=1.0):
+        # Stops the search at its next node and waits for the thread to exit, the result is discarded
+        self.computerPlayer.cancel_search()
+        self.thread.join(timeout)
@@ -0,0 +1,166 @@
+import argparse
+import json
+import math
+import multiprocessing
+import os
+import time
+from bitboard import MIN_BOARD_SIZE, MAX_BOARD_SIZE
+from rules import move_to_text
+from ai_player import ComputerPlayer, BoardState
+from endgame import ENDGAME_EMPTIES
+from game_record import RECORD_MAGIC, GameRecords, replay
+
+# Batch position analysis: searches every position of a file with ComputerPlayer on a process pool, without pygame
+# Each position is searched by a fresh player (empty transposition table), so results don't depend on which positions a
+# process got before and any number of processes give the same results.
+#
+# Examples:
+#   python analyse.py positions.txt --depth 6 --output analysis.jsonl
+#   python analyse.py games.bin --time 200 -j 8
+#
+# Input is either a game record file (see game_record.py), every position before a move of every game is analysed, or a
+# text file with one position per line: the board as a string of 'S', 'O' and '-' row by row (64 characters for 8x8,
+# any even size from 4 to 16 works), the player to move and optionally the S and O pattern scores so far, e.g.
+#   ---------------------------OS------SO--------------------------- S 0 0
+# Blank lines and lines starting with '#' are skipped.
+#
+# Results are appended to the output file as one JSON object per line as soon as they are ready (in completion order):
+#   {"index": 0, "board": "...", "player": "S", "sPatterns": 0, "oPatterns": 0, "move": "d3", "score": 12.0,
+#    "depth": 6, "nodes": 5120, "solved": false, "ms": 41.2}
+# index is the position's number in the input. Running the same command again skips the positions already in the output
+# file, so an interrupted analysis continues where it stopped (--restart starts over).
+
+def parse_position(line):
+    # Returns (board, player, sPatternScore, oPatternScore) of a position line
+    fields = line.split()
+    if len(fields) not in (2, 4):
+        raise ValueError("expected a board, the player to move and optionally the two pattern scores")
+
+    board, player = fields[0].upper(), fields[1].upper()
+    size = math.isqrt(len(board))
+    if size * size != len(board) or size % 2 or not MIN_BOARD_SIZE <= size <= MAX_BOARD_SIZE:
+        raise ValueError(f"a board of {len(board)} cells is not an even NxN board from {MIN_BOARD_SIZE} to {MAX_BOARD_SIZE}")
+    if board.strip('SO-'):
+        raise ValueError("the board may only contain 'S', 'O' and '-'")
+    if player not in ('S', 'O'):
+        raise ValueError(f"invalid player to move {fields[1]!r}")
+
+    sPatternScore, oPatternScore = (int(fields[2]), int(fields[3])) if len(fields) == 4 else (0, 0)
+    return board, player, sPatternScore, oPatternScore
+
+def read_positions(path):
+    # Yields (board, player, sPatternScore, oPatternScore) of every position in the file
+    with open(path, 'rb') as inputFile:
+        isRecordFile = inputFile.read(len(RECORD_MAGIC)) == RECORD_MAGIC
+
+    if isRecordFile:
+        records = GameRecords(path)
+        for record in records:
+            cells = record.size * record.size
+            for sBits, oBits, player, sPatternScore, oPatternScore, _ in replay(record):
+                board = ''.join('S' if sBits >> square & 1 else 'O' if oBits >> square & 1 else '-' for square in range(cells))
+                yield board, player, sPatternScore, oPatternScore
+        records.close()
+        return
+
+    with open(path) as inputFile:
+        for lineNumber, line in enumerate(inputFile, 1):
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            try:
+                yield parse_position(line)
+            except ValueError as e:
+                raise ValueError(f"{path}:{lineNumber}: {e}") from None
+
+def finished_indices(path):
+    # Indices already in the output file. A line cut off by an interruption is removed so new results start on a new line.
+    if not os.path.exists(path):
+        return set()
+
+    with open(path, 'rb+') as outputFile:
+        data = outputFile.read()
+        complete = data.rfind(b'\n') + 1
+        if complete != len(data):
+            outputFile.truncate(complete)
+
+    finished = set()
+    for line in data[:complete].splitlines():
+        try:
+            finished.add(json.loads(line)['index'])
+        except (ValueError, KeyError, TypeError):
+            continue
+    return finished
+
+# Worker side
+def analyse_job(job):
+    # Searches one position, job is (index, board, player, sPatternScore, oPatternScore, search settings)
+    index, board, player, sPatternScore, oPatternScore, settings = job
+    size = math.isqrt(len(board))
+    grid = [list(board[row * size:(row + 1) * size]) for row in range(size)]
+
+    computerPlayer = ComputerPlayer(player, settings['depth'], BoardState(grid, sPatternScore, oPatternScore), settings['tt'],
+                                    settings['time'], endgameEmpties=settings['endgame'])
+    start = time.perf_counter()
+    move, stats = computerPlayer.get_best_move_with_stats()
+    elapsed = time.perf_counter() - start
+
+    return {
+        'index': index,
+        'board': board,
+        'player': player,
+        'sPatterns': sPatternScore,
+        'oPatterns': oPatternScore,
+        'move': move_to_text(move) if move else None, # None when the player has to skip
+        'score': stats.score if stats else None,
+        'depth': stats.depth if stats else 0,
+        'nodes': stats.nodes if stats else 0,
+        'solved': stats.solved if stats else False,
+        'ms': round(1000 * elapsed, 1),
+    }
+
+# Main process side
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Analyse FlipSOS positions with the engine.')
+    parser.add_argument('input', help='positions file or game record file')
+    parser.add_argument('--output', '-o', default='analysis.jsonl', help='JSON lines file the results are appended to (default: analysis.jsonl)')
+    parser.add_argument('--depth', '-d', type=int, default=4, help='search depth (default: 4)')
+    parser.add_argument('--time', type=int, help='time limit per position in ms, iterative deepening instead of a fixed depth')
+    parser.add_argument('--tt', type=int, default=16, help='transposition table size in MB (default: 16)')
+    parser.add_argument('--endgame', type=int, default=ENDGAME_EMPTIES, help=f'empty squares at which the endgame solver takes over, 0 turns it off (default: {ENDGAME_EMPTIES})')
+    parser.add_argument('--workers', '-j', type=int, default=os.cpu_count(), help='positions analysed at the same time (default: all cores)')
+    parser.add_argument('--restart', action='store_true', help='overwrite the output file instead of skipping the positions already in it')
+    args = parser.parse_args(argv)
+
+    settings = {'depth': args.depth, 'time': args.time, 'tt': args.tt, 'endgame': args.endgame}
+    try:
+        if args.restart and os.path.exists(args.output):
+            os.remove(args.output)
+        finished = finished_indices(args.output)
+        jobs = [(index, *position, settings) for index, position in enumerate(read_positions(args.input)) if index not in finished]
+    except (OSError, ValueError) as e:
+        parser.error(str(e))
+
+    if not jobs:
+        print(f"All {len(finished)} positions are already in {args.output}")
+        return
+    workers = max(1, min(args.workers, len(jobs)))
+    resumed = f", {len(finished)} already in {args.output}" if finished else ''
+    print(f"Analysing {len(jobs)} of {len(jobs) + len(finished)} positions{resumed} on {workers} processes", flush=True)
+
+    done, nodes = 0, 0
+    progressStep = max(1, len(jobs) // 20)
+    chunkSize = max(1, min(64, len(jobs) // (workers * 16))) # Big enough to keep the pool's overhead low, small enough to balance the load
+    startTime = time.perf_counter()
+    with open(args.output, 'a') as outputFile, multiprocessing.Pool(workers) as pool:
+        for result in pool.imap_unordered(analyse_job, jobs, chunkSize):
+            outputFile.write(json.dumps(result) + '\n')
+            outputFile.flush() # Everything written survives an interruption
+            done += 1
+            nodes += result['nodes']
+            if done % progressStep == 0 or done == len(jobs):
+                elapsed = time.perf_counter() - startTime
+                print(f"  {done}/{len(jobs)} positions   {done / elapsed:,.1f} positions/s   {nodes / elapsed:,.0f} nodes/s", flush=True)
+
+if __name__ == '__main__':
+    main()
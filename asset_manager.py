@@ -0,0 +1,48 @@
+import pygame
+
+# Process-wide asset cache
+# Images, sprites and fonts are loaded (and scaled) the first time they are asked for and shared afterwards, so the home
+# screen and the Grid built on every retry reuse them. Surfaces composed from them (board backgrounds) are cached the
+# same way with composed(). Nothing may draw on a shared surface, callers that need to change one work on a copy.
+# Images are converted to the display's pixel format, the display has to be set up before the first one is loaded.
+
+SPRITE_SHEET = 'assets/Sprite Sheet.png'
+SPRITE_SIZE = (192, 192) # Size of each sprite in the sheet
+SPRITE_COLUMNS = 'ABCDEFG' # Sprites are named by column letter and row number ('A0' to 'G2')
+
+images = {} # (path, size) -> surface, size None for the image as stored
+sprites = {} # (name, size) -> surface
+fonts = {} # (path, size) -> pygame.font.Font
+composedSurfaces = {} # key -> surface built by composed()
+
+def load_image(path, size=None):
+    key = (path, size)
+    if key not in images:
+        if size is None:
+            images[key] = pygame.image.load(path).convert_alpha() # To make png transparent
+        else:
+            images[key] = pygame.transform.scale(load_image(path), size)
+    return images[key]
+
+def load_sprite(name, size):
+    # Sprite of the sprite sheet scaled to size
+    key = (name, size)
+    if key not in sprites:
+        x, y = SPRITE_COLUMNS.index(name[0]), int(name[1:])
+        sprite = pygame.Surface(SPRITE_SIZE).convert_alpha()
+        sprite.blit(load_image(SPRITE_SHEET), (0, 0), (x * SPRITE_SIZE[0], y * SPRITE_SIZE[1], SPRITE_SIZE[0], SPRITE_SIZE[1]))
+        sprites[key] = pygame.transform.scale(sprite, size)
+    return sprites[key]
+
+def load_font(path, size):
+    # Raises FileNotFoundError like pygame.font.Font, a missing font is not cached
+    key = (path, size)
+    if key not in fonts:
+        fonts[key] = pygame.font.Font(path, size)
+    return fonts[key]
+
+def composed(key, build):
+    # Surface returned by build(), called the first time key is asked for
+    if key not in composedSurfaces:
+        composedSurfaces[key] = build()
+    return composedSurfaces[key]
@@ -0,0 +1,127 @@
+import numpy as np
+
+# Batched version of ComputerPlayer.heuristic_evaluation
+# Boards are an (N, 64) int8 array from the evaluated player's point of view: 1 = own token, -1 = opponent token, 0 = empty,
+# cell (row, col) at index row * 8 + col. Every term is computed for all N boards at once with the same formulas
+# (and the same order of float operations) as heuristic_evaluation, so the scores match it exactly.
+
+VALUE_VECTOR = np.array([
+    100, -10,  11,   6,   6,  11, -10, 100,
+    -10, -20,   1,   2,   2,   1, -20, -10,
+     10,   1,   5,   4,   4,   5,   1,  10,
+      6,   2,   4,   2,   2,   4,   2,   6,
+      6,   2,   4,   2,   2,   4,   2,   6,
+     10,   1,   5,   4,   4,   5,   1,  10,
+    -10, -20,   1,   2,   2,   1, -20, -10,
+    100, -10,  11,   6,   6,  11, -10, 100,
+], dtype=np.int64)
+
+def set_value_table(valueTable):
+    # Replaces VALUE_VECTOR, for ai_player's tuned value table
+    global VALUE_VECTOR
+    VALUE_VECTOR = np.array([value for row in valueTable for value in row], dtype=np.int64)
+
+CORNER_INDICES = np.array([0, 7, 56, 63])
+CORNER_ADJACENT_INDICES = np.array([ # Three cells next to each corner, same order as CORNER_INDICES
+    [1, 8, 9],
+    [6, 14, 15],
+    [48, 49, 57],
+    [54, 55, 62],
+])
+
+# Bitboard masks and shifts (see bitboard.py) as uint64 scalars, so mobility and frontier run on one uint64 per board
+NOT_COL_0 = np.uint64(0xFEFEFEFEFEFEFEFE)
+NOT_COL_7 = np.uint64(0x7F7F7F7F7F7F7F7F)
+INNER_COLS = np.uint64(0x7E7E7E7E7E7E7E7E)
+SHIFT_AMOUNTS = (np.uint64(1), np.uint64(7), np.uint64(8), np.uint64(9))
+SHIFT_AMOUNTS_COLUMN = np.array(SHIFT_AMOUNTS, dtype=np.uint64)[:, np.newaxis]
+
+def bitboards_to_boards(ownBits, oppBits):
+    # Converts two lists of 64-bit ints into an (N, 64) int8 board array
+    own = np.array(ownBits, dtype=np.uint64).view(np.uint8).reshape(-1, 8)
+    opp = np.array(oppBits, dtype=np.uint64).view(np.uint8).reshape(-1, 8)
+    return np.unpackbits(own, axis=1, bitorder='little').astype(np.int8) - np.unpackbits(opp, axis=1, bitorder='little').astype(np.int8)
+
+def boards_to_bitboards(cells):
+    # (N, 64) bool array to N uint64 bitboards (bit i = cell i)
+    return np.packbits(cells, axis=1, bitorder='little').view(np.uint64).ravel()
+
+def popcount(bits):
+    if hasattr(np, 'bitwise_count'):
+        return np.bitwise_count(bits).astype(np.int64)
+    return np.unpackbits(bits.view(np.uint8).reshape(-1, 8), axis=1).sum(axis=1).astype(np.int64) # NumPy < 2.0
+
+def neighbours(bits):
+    # All cells adjacent to at least one set cell, for every board
+    one, eight = SHIFT_AMOUNTS[0], SHIFT_AMOUNTS[2]
+    sideways = ((bits << one) & NOT_COL_0) | ((bits >> one) & NOT_COL_7)
+    rows = bits | sideways
+    return sideways | (rows << eight) | (rows >> eight)
+
+def valid_moves(own, opp):
+    # Same dumb7fill as bitboard.valid_moves_mask, for every board at once
+    # The four line directions are stacked on a new first axis so each shift step is a single NumPy operation
+    empty = ~(own | opp)
+    inner = opp & INNER_COLS
+    masks = np.stack((inner, inner, opp, inner))
+    amounts = SHIFT_AMOUNTS_COLUMN
+    own = own[np.newaxis, :]
+
+    line = (own << amounts) & masks
+    for _ in range(5):
+        line |= (line << amounts) & masks
+    moves = line << amounts
+
+    line = (own >> amounts) & masks
+    for _ in range(5):
+        line |= (line >> amounts) & masks
+    moves |= line >> amounts
+
+    return np.bitwise_or.reduce(moves, axis=0) & empty
+
+def feature_terms(boards):
+    # Every board-only term of the evaluation, as arrays of N values
+    own = boards == 1
+    opp = boards == -1
+    empty = boards == 0
+
+    staticValue = own.astype(np.int64) @ VALUE_VECTOR - opp.astype(np.int64) @ VALUE_VECTOR
+
+    ownTokens, oppTokens = own.sum(axis=1), opp.sum(axis=1)
+    tokenTotal = ownTokens + oppTokens
+    tokenDiff = np.where(tokenTotal == 0, 0, 100 * (ownTokens - oppTokens) / np.maximum(tokenTotal, 1))
+
+    # Frontier tokens are the ones next to an empty cell
+    ownBits, oppBits = boards_to_bitboards(own), boards_to_bitboards(opp)
+    nextToEmpty = neighbours(~(ownBits | oppBits))
+    ownFront, oppFront = popcount(ownBits & nextToEmpty), popcount(oppBits & nextToEmpty)
+    frontTotal = ownFront + oppFront
+    frontier = np.where(frontTotal == 0, 0, 100 * (oppFront - ownFront) / np.maximum(frontTotal, 1))
+
+    # Both sides' moves in one call
+    validMoves = popcount(valid_moves(np.concatenate((ownBits, oppBits)), np.concatenate((oppBits, ownBits))))
+    ownValidMoves, oppValidMoves = validMoves[:len(ownBits)], validMoves[len(ownBits):]
+    movesTotal = ownValidMoves + oppValidMoves
+    mobility = np.where(movesTotal == 0, 0, 100 * (ownValidMoves - oppValidMoves) / np.maximum(movesTotal, 1))
+
+    cornerScore = 25 * (own[:, CORNER_INDICES].sum(axis=1) - opp[:, CORNER_INDICES].sum(axis=1))
+
+    emptyCorner = empty[:, CORNER_INDICES]
+    ownAdj = (own[:, CORNER_ADJACENT_INDICES].sum(axis=2) * emptyCorner).sum(axis=1)
+    oppAdj = (opp[:, CORNER_ADJACENT_INDICES].sum(axis=2) * emptyCorner).sum(axis=1)
+    cornerAdj = 12.5 * (oppAdj - ownAdj)
+
+    return staticValue, tokenDiff, frontier, mobility, cornerScore, cornerAdj
+
+def evaluate_boards(boards, ownPatternScores, oppPatternScores, weights):
+    # Scores of N boards, the pattern scores are arrays of the pattern points each side gained during the search
+    # weights are the seven term weights of ComputerPlayer.weights
+    staticValue, tokenDiff, frontier, mobility, cornerScore, cornerAdj = feature_terms(boards)
+
+    ownPatternScores = np.asarray(ownPatternScores)
+    oppPatternScores = np.asarray(oppPatternScores)
+    patternTotal = ownPatternScores + oppPatternScores
+    patternScoreDiff = np.where(patternTotal == 0, 0, 100 * (ownPatternScores - oppPatternScores) / np.maximum(patternTotal, 1))
+
+    wStatic, wTokens, wFrontier, wMobility, wCorners, wCornerAdj, wPatterns = weights
+    return (wStatic * staticValue) + (wTokens * tokenDiff) + (wFrontier * frontier) + (wMobility * mobility) + (wCorners * cornerScore) + (wCornerAdj * cornerAdj) + (wPatterns * patternScoreDiff)
@@ -0,0 +1,254 @@
+import argparse
+import json
+import platform
+import random
+import sys
+import time
+from rules import GameState, find_valid_moves, find_move_flips, find_patterns, move_to_text, text_to_move
+from ai_player import ComputerPlayer, copy_grid
+
+# Reproducible engine benchmarks, results are printed (or written) as JSON so runs can be diffed
+#
+#   perft   Counts every line of play to a fixed depth from each benchmark position with the rules functions
+#           (find_move_flips, find_valid_moves, find_patterns). The counts are checked against EXPECTED_PERFT,
+#           so this also tells whether an optimised move generator still plays the same game.
+#   search  Fixed depth get_best_move_ab from each position: best move, nodes, nodes/s, wall time and search statistics.
+#           The endgame solver is off so every position is searched the same way.
+#   endgame Exact and win/draw/loss solves (endgame.EndgameSolver) of the positions with at most --endgame-empties empty
+#           squares: best move, final margin, nodes and wall time.
+#   scaling Perft and fixed depth search on each board size of --sizes, from a middle game position with the same share of
+#           the board filled (SCALING_FILL, seeded random moves): moves available, perft leaves, search nodes, time and
+#           branching factor, to see how the search grows with the board.
+#
+# Example:
+#   python benchmark.py --output before.json
+#   python benchmark.py --only perft --repeat 3
+
+# Benchmark positions: the moves played from the starting position (text notation, see rules.move_to_text) and their perft depth
+POSITIONS = {
+    'start': ('', 6),
+    'opening-12': ('e6 f4 g3 d6 e3 f6 c7 d7 g7 g4 e7 g2', 4),
+    'midgame-24': ('e6 d6 c6 d7 e8 b6 c5 f6 a7 d8 e3 f3 g7 b4 e7 c4 c8 g6 a3 f5 g5 h7 b3 g8', 4),
+    'midgame-36': ('c4 e3 f5 c6 d3 e6 c5 c3 f3 f6 b5 d6 b3 b6 f7 e2 f4 b2 e1 g7 b1 a3 d7 b4 h8 g8 e7 g3 a6 c1 f2 c7 b7 f8 c2 g1', 4),
+    'endgame-48': ('e6 d6 c4 d3 c3 b5 b3 f5 g5 f6 f4 g3 d7 e3 f7 d8 e2 f3 g4 a2 h2 d2 c1 b2 c7 g7 c5 h4 h3 e1 f2 b6 a3 e7 f8 c6 g6 b4 c8 h7 h5 g1 d1 g2 a5 a4 h1 a6', 5),
+    'endgame-54': ('d3 c5 c6 e3 f5 e6 d7 c7 b5 a5 f3 f2 c8 f4 f1 g6 g4 d6 c4 g3 f6 h5 h7 g1 e2 b7 g5 c2 e7 b4 d2 b8 c3 c1 a6 e1 b6 f8 a4 a7 f7 g7 d8 e8 d1 b2 h2 h3 h8 h1 a1 b3 a8 g8', 10), # Played out to the end, with skipped turns
+}
+
+SEARCH_DEPTH = 6
+ENDGAME_EMPTIES = 12
+
+SCALING_SIZES = (8, 10, 12)
+SCALING_FILL = 0.4
+SCALING_PERFT_DEPTH = 3
+SCALING_DEPTH = 4
+SCALING_SEED = 2024
+
+# (leaves, passes, game ends, patterns) of each position at its perft depth, counted with the original list based rules
+EXPECTED_PERFT = {
+    'start': (8200, 0, 0, 5636),
+    'opening-12': (5555, 0, 0, 7177),
+    'midgame-24': (15411, 0, 0, 39093),
+    'midgame-36': (23807, 0, 0, 59045),
+    'endgame-48': (15061, 0, 0, 56608),
+    'endgame-54': (166, 95, 166, 2676),
+}
+
+def load_position(name):
+    state = GameState()
+    for text in POSITIONS[name][0].split():
+        state.play_move(*text_to_move(text))
+    return state
+
+def perft(grid, player, depth, counts):
+    # Walks every line of play depth moves deep, a skipped turn counts as a move
+    # counts is [leaves, passes, game ends, patterns], game ends before the full depth also count as leaves
+    if depth == 0:
+        counts[0] += 1
+        return
+
+    opponent = 'O' if player == 'S' else 'S'
+    moveFlips = find_move_flips(grid, player)
+
+    if not moveFlips:
+        if not find_valid_moves(grid, opponent):
+            counts[0] += 1
+            counts[2] += 1
+        else:
+            counts[1] += 1
+            perft(grid, opponent, depth - 1, counts)
+        return
+
+    for swappableTiles in moveFlips.values():
+        newGrid = copy_grid(grid)
+        for tx, ty in swappableTiles:
+            newGrid[tx][ty] = player
+        counts[3] += len(find_patterns(newGrid, swappableTiles))
+        perft(newGrid, opponent, depth - 1, counts)
+
+def best_time(function, repeat):
+    # Runs function repeat times, returns its last result and the fastest wall time
+    bestSeconds = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        bestSeconds = min(bestSeconds, time.perf_counter() - start)
+    return result, bestSeconds
+
+def run_perft(name, depth, repeat):
+    depth = depth or POSITIONS[name][1]
+    state = load_position(name)
+
+    def count():
+        counts = [0, 0, 0, 0]
+        perft(state.gridLogic, state.currentPlayer, depth, counts)
+        return counts
+
+    counts, seconds = best_time(count, repeat)
+    result = {
+        'position': name,
+        'depth': depth,
+        'leaves': counts[0],
+        'passes': counts[1],
+        'gameEnds': counts[2],
+        'patterns': counts[3],
+        'seconds': round(seconds, 6),
+        'leavesPerSecond': round(counts[0] / seconds),
+    }
+
+    expected = EXPECTED_PERFT.get(name) if depth == POSITIONS[name][1] else None
+    if expected is not None:
+        result['matchesExpected'] = tuple(counts) == expected
+    return result
+
+def run_search(name, depth, repeat):
+    state = load_position(name)
+
+    def search():
+        computerPlayer = ComputerPlayer(state.currentPlayer, depth, state, endgameEmpties=0) # New player each run, so the transposition table starts empty
+        return computerPlayer.get_best_move_with_stats()
+
+    (move, stats), seconds = best_time(search, repeat)
+    return {
+        'position': name,
+        'depth': depth,
+        'bestMove': move_to_text(move) if move else None,
+        'nodes': stats.nodes,
+        'seconds': round(seconds, 6),
+        'nodesPerSecond': round(stats.nodes / seconds),
+        'leafEvaluations': stats.leafEvaluations,
+        'cutoffRate': round(stats.cutoff_rate(), 4),
+        'firstMoveCutoffRatio': round(stats.first_move_cutoff_ratio(), 4),
+        'ttHitRate': round(stats.tt_hit_rate(), 4),
+        'branchingFactor': round(stats.branching_factor(), 3),
+    }
+
+def run_endgame(name, exact, repeat):
+    state = load_position(name)
+
+    def solve():
+        computerPlayer = ComputerPlayer(state.currentPlayer, SEARCH_DEPTH, state, endgameEmpties=64, endgameExact=exact)
+        return computerPlayer.get_best_move_with_stats()
+
+    (move, stats), seconds = best_time(solve, repeat)
+    return {
+        'position': name,
+        'mode': 'exact' if exact else 'wld',
+        'empties': stats.depth,
+        'bestMove': move_to_text(move) if move else None,
+        'margin': stats.score,
+        'nodes': stats.nodes,
+        'seconds': round(seconds, 6),
+        'nodesPerSecond': round(stats.nodes / seconds),
+    }
+
+def scaling_position(size):
+    # Same position every run: moves picked by a seeded generator until SCALING_FILL of the board is covered
+    rng = random.Random(SCALING_SEED)
+    state = GameState(size)
+    while state.sScore + state.oScore < SCALING_FILL * size * size and not state.gameOver:
+        state.play_move(*rng.choice(state.validMoves))
+    return state
+
+def run_scaling(size, perftDepth, searchDepth, repeat):
+    state = scaling_position(size)
+
+    def count():
+        counts = [0, 0, 0, 0]
+        perft(state.gridLogic, state.currentPlayer, perftDepth, counts)
+        return counts
+
+    def search():
+        computerPlayer = ComputerPlayer(state.currentPlayer, searchDepth, state, endgameEmpties=0)
+        return computerPlayer.get_best_move_with_stats()
+
+    counts, perftSeconds = best_time(count, repeat)
+    (move, stats), searchSeconds = best_time(search, repeat)
+    return {
+        'size': size,
+        'tokens': state.sScore + state.oScore,
+        'validMoves': len(state.validMoves),
+        'perftDepth': perftDepth,
+        'perftLeaves': counts[0],
+        'perftSeconds': round(perftSeconds, 6),
+        'searchDepth': searchDepth,
+        'bestMove': move_to_text(move) if move else None,
+        'nodes': stats.nodes,
+        'seconds': round(searchSeconds, 6),
+        'nodesPerSecond': round(stats.nodes / searchSeconds),
+        'branchingFactor': round(stats.branching_factor(), 3),
+        'effectiveBranchingFactor': round(stats.effective_branching_factor(), 3),
+    }
+
+def empty_cells(name):
+    state = load_position(name)
+    return 64 - state.sScore - state.oScore
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the FlipSOS move generator and search.')
+    parser.add_argument('--only', choices=('perft', 'search', 'endgame', 'scaling'), help='run a single benchmark')
+    parser.add_argument('--positions', nargs='+', choices=list(POSITIONS), default=list(POSITIONS), help='positions to run (default: all)')
+    parser.add_argument('--perft-depth', type=int, help="perft depth for every position (default: each position's own depth, the one with expected counts)")
+    parser.add_argument('--search-depth', type=int, default=SEARCH_DEPTH, help=f'alpha-beta search depth (default: {SEARCH_DEPTH})')
+    parser.add_argument('--endgame-empties', type=int, default=ENDGAME_EMPTIES, help=f'solve the positions with at most this many empty squares (default: {ENDGAME_EMPTIES})')
+    parser.add_argument('--sizes', type=int, nargs='+', default=SCALING_SIZES, help=f"board sizes of the scaling benchmark (default: {' '.join(map(str, SCALING_SIZES))})")
+    parser.add_argument('--scaling-depth', type=int, default=SCALING_DEPTH, help=f'search depth of the scaling benchmark (default: {SCALING_DEPTH})')
+    parser.add_argument('--repeat', type=int, default=1, help='runs per benchmark, the fastest time is reported (default: 1)')
+    parser.add_argument('--output', '-o', help='write the JSON to this file instead of stdout')
+    args = parser.parse_args(argv)
+    for size in args.sizes:
+        try:
+            GameState(size)
+        except ValueError as e:
+            parser.error(str(e))
+
+    results = {
+        'python': platform.python_version(),
+        'implementation': platform.python_implementation(),
+        'machine': platform.machine(),
+    }
+
+    if args.only in (None, 'perft'):
+        results['perft'] = [run_perft(name, args.perft_depth, args.repeat) for name in args.positions]
+    if args.only in (None, 'search'):
+        results['search'] = [run_search(name, args.search_depth, args.repeat) for name in args.positions]
+    if args.only in (None, 'endgame'):
+        names = [name for name in args.positions if 0 < empty_cells(name) <= args.endgame_empties]
+        results['endgame'] = [run_endgame(name, exact, args.repeat) for name in names for exact in (True, False)]
+    if args.only in (None, 'scaling'):
+        results['scaling'] = [run_scaling(size, SCALING_PERFT_DEPTH, args.scaling_depth, args.repeat) for size in args.sizes]
+
+    text = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, 'w') as outputFile:
+            outputFile.write(text + '\n')
+    else:
+        print(text)
+
+    # A wrong perft count means the rules changed, fail so scripts notice
+    if any(result.get('matchesExpected') is False for result in results.get('perft', [])):
+        print('perft counts differ from EXPECTED_PERFT', file=sys.stderr)
+        return 1
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,299 @@
+# Bitboard backend for the game logic
+# A board side is stored as an integer where bit (row * size + col) is set if that side owns the cell.
+# Move generation and flip computation are done with shifts, masks and precomputed rays instead of walking the 2D grid.
+# Everything that depends on the board size (masks, rays, neighbours, pattern lines) is built once per size in a
+# BoardGeometry, see board_geometry(). The functions below take it as their last argument and default to the 8x8 board.
+
+BOARD_SIZE = 8 # Size of the standard board
+MIN_BOARD_SIZE, MAX_BOARD_SIZE = 4, 16 # Even sizes in between are supported (the starting tokens go on the centre 2x2)
+
+# Directions as (row step, col step), in the same order as the grid functions
+# (left, down-left, down, down-right, right, up-right, up, up-left) with down being towards higher bits
+DIRECTION_STEPS = ((0, -1), (1, -1), (1, 0), (1, 1), (0, 1), (-1, 1), (-1, 0), (-1, -1))
+
+# SOS pattern lines: horizontal right, vertical down, diagonal down-right, diagonal down-left
+PATTERN_DIRECTIONS = ((0, 1), (1, 0), (1, 1), (1, -1))
+
+# Translation tables used to turn a joined grid string into '0'/'1' strings for int(..., 2)
+S_TABLE = str.maketrans('SO-', '100')
+O_TABLE = str.maketrans('SO-', '010')
+
+# Tables of one board size
+class BoardGeometry:
+    def __init__(self, size):
+        if size % 2 or not MIN_BOARD_SIZE <= size <= MAX_BOARD_SIZE:
+            raise ValueError(f"Unsupported board size {size}, expected an even size from {MIN_BOARD_SIZE} to {MAX_BOARD_SIZE}")
+
+        self.size = size
+        self.cells = size * size
+        self.fullBoard = (1 << self.cells) - 1
+        self.coords = [divmod(square, size) for square in range(self.cells)] # (row, col) of every square
+
+        firstCol = sum(1 << (row * size) for row in range(size))
+        lastCol = firstCol << (size - 1)
+        self.notFirstCol = self.fullBoard & ~firstCol
+        self.notLastCol = self.fullBoard & ~lastCol
+        self.innerCols = self.notFirstCol & self.notLastCol
+
+        # (shift amount, mask) of the four line directions for the shift based move generator
+        # Opponent tokens on the first/last column can't be jumped horizontally or diagonally, masking them out stops wrap-around
+        self.lineShifts = (1, size - 1, size, size + 1)
+        self.extraFillSteps = range(max(0, size - 8)) # A line of opponent tokens between two cells is at most size - 2 long
+
+        # Rays: for every square, the squares walked outwards in each direction (as bits), directions too short to flip
+        # anything (fewer than two squares) are left out
+        self.rays = []
+        for row, col in self.coords:
+            rays = []
+            for dx, dy in DIRECTION_STEPS:
+                ray = []
+                x, y = row + dx, col + dy
+                while 0 <= x < size and 0 <= y < size:
+                    ray.append(1 << (x * size + y))
+                    x, y = x + dx, y + dy
+                if len(ray) >= 2:
+                    rays.append(tuple(ray))
+            self.rays.append(tuple(rays))
+
+        # (row, col) of the cells adjacent to each square, for code that walks the list grid
+        self.neighbourCoords = [tuple((x, y) for x in range(row - 1, row + 2) for y in range(col - 1, col + 2)
+                                      if 0 <= x < size and 0 <= y < size and (x, y) != (row, col))
+                                for row, col in self.coords]
+
+        # Quadrants of the board, for the endgame solver's parity ordering
+        half = size // 2
+        self.quadrants = tuple(sum(1 << (x * size + y) for x in range(top, top + half) for y in range(left, left + half))
+                               for top in (0, half) for left in (0, half))
+
+        # Starting tokens as ((row, col), token), same positions as Grid.regen_grid on the standard board
+        self.startTokens = (((half - 1, half - 1), 'O'), ((half - 1, half), 'S'), ((half, half), 'O'), ((half, half - 1), 'S'))
+
+        self.build_pattern_lines()
+
+    def build_pattern_lines(self):
+        # Every 3-cell line on the board. patternLines holds the coordinates and patternMasks the (ends, middle) masks.
+        # For each square the lines through it are listed in the order the grid's find_patterns checks them (direction,
+        # then offset), both as indices (linesThrough) and as one bitmask over line indices (lineSets).
+        size = self.size
+        lines = []
+        masks = []
+        lineIndex = {}
+        linesThrough = [[] for _ in range(self.cells)]
+
+        for square in range(self.cells):
+            cx, cy = self.coords[square]
+            for dx, dy in PATTERN_DIRECTIONS:
+                for offset in (-2, -1, 0):
+                    coordinates = ((cx + dx * offset, cy + dy * offset),
+                                   (cx + dx * (offset + 1), cy + dy * (offset + 1)),
+                                   (cx + dx * (offset + 2), cy + dy * (offset + 2)))
+                    if not all(0 <= x < size and 0 <= y < size for x, y in coordinates):
+                        continue
+
+                    key = frozenset(coordinates)
+                    if key not in lineIndex:
+                        (x1, y1), (x2, y2), (x3, y3) = coordinates
+                        lineIndex[key] = len(lines)
+                        lines.append(coordinates)
+                        masks.append(((1 << (x1 * size + y1)) | (1 << (x3 * size + y3)), 1 << (x2 * size + y2)))
+                    linesThrough[square].append(lineIndex[key])
+
+        self.patternLines = lines
+        self.patternMasks = masks
+        self.linesThrough = linesThrough
+        self.lineSets = [sum(1 << index for index in indices) for indices in linesThrough]
+
+geometries = {} # size -> BoardGeometry, built the first time a size is used
+
+def board_geometry(size=BOARD_SIZE):
+    if size not in geometries:
+        geometries[size] = BoardGeometry(size)
+    return geometries[size]
+
+STANDARD = board_geometry(BOARD_SIZE)
+
+def grid_geometry(grid):
+    # BoardGeometry of a list-of-lists grid
+    return board_geometry(len(grid))
+
+def grid_to_bitboards(grid):
+    # Returns (sBits, oBits) for a list-of-lists grid of 'S'/'O'/'-'
+    cells = ''.join([''.join(row) for row in grid])[::-1] # Reversed so cell 0 becomes the lowest bit
+    return int(cells.translate(S_TABLE), 2), int(cells.translate(O_TABLE), 2)
+
+def player_bitboards(grid, player):
+    # Returns (ownBits, oppBits) from the point of view of player
+    sBits, oBits = grid_to_bitboards(grid)
+    return (sBits, oBits) if player == 'S' else (oBits, sBits)
+
+def iter_bits(bits):
+    # Yields the index of every set bit, lowest first
+    while bits:
+        low = bits & -bits
+        yield low.bit_length() - 1
+        bits ^= low
+
+def bits_to_coords(bits, geometry=STANDARD):
+    # Converts a bitboard into a list of (row, col) in raster order
+    coords = []
+    coordsBySquare = geometry.coords
+    while bits:
+        low = bits & -bits
+        coords.append(coordsBySquare[low.bit_length() - 1])
+        bits ^= low
+    return coords
+
+def neighbours(bits, geometry=STANDARD):
+    # All cells adjacent to at least one set cell
+    size = geometry.size
+    sideways = ((bits << 1) & geometry.notFirstCol) | ((bits >> 1) & geometry.notLastCol)
+    rows = bits | sideways
+    return (sideways | (rows << size) | (rows >> size)) & geometry.fullBoard
+
+def clickable_mask(own, opp, geometry=STANDARD):
+    # Empty cells with at least one opponent token adjacent to them
+    return neighbours(opp, geometry) & ~(own | opp) & geometry.fullBoard
+
+def valid_moves_mask(own, opp, geometry=STANDARD):
+    # Empty cells that flip at least one opponent token (dumb7fill in both directions of every line)
+    # Six fill steps cover the lines of boards up to 8x8 (extra steps on smaller boards find nothing), larger boards need more
+    empty = ~(own | opp) & geometry.fullBoard
+    inner = opp & geometry.innerCols
+    extraSteps = geometry.extraFillSteps
+    moves = 0
+
+    for amount, mask in zip(geometry.lineShifts, (inner, inner, opp, inner)):
+        line = (own << amount) & mask
+        line |= (line << amount) & mask
+        line |= (line << amount) & mask
+        line |= (line << amount) & mask
+        line |= (line << amount) & mask
+        line |= (line << amount) & mask
+        if extraSteps:
+            for _ in extraSteps:
+                line |= (line << amount) & mask
+        moves |= line << amount
+
+        line = (own >> amount) & mask
+        line |= (line >> amount) & mask
+        line |= (line >> amount) & mask
+        line |= (line >> amount) & mask
+        line |= (line >> amount) & mask
+        line |= (line >> amount) & mask
+        if extraSteps:
+            for _ in extraSteps:
+                line |= (line >> amount) & mask
+        moves |= line >> amount
+
+    return moves & empty
+
+def flips_mask(own, opp, square, geometry=STANDARD):
+    # Opponent tokens flipped if player places a token on square (the placed token is not included)
+    flips = 0
+
+    for ray in geometry.rays[square]:
+        # Collect opponent tokens until a player token closes the line
+        line = 0
+        for cell in ray:
+            if cell & opp:
+                line |= cell
+            else:
+                if cell & own:
+                    flips |= line
+                break
+
+    return flips
+
+def move_flips(own, opp, geometry=STANDARD):
+    # {(row, col): flips mask} of every valid move in one pass: the rays of each empty cell next to an opponent token are
+    # walked once, a cell that flips nothing is not a move. In ascending square order, the same as bits_to_coords.
+    coords = geometry.coords
+    rays = geometry.rays
+    candidates = neighbours(opp, geometry) & ~(own | opp)
+    moves = {}
+
+    while candidates:
+        low = candidates & -candidates
+        candidates ^= low
+        square = low.bit_length() - 1
+        flips = 0
+        for ray in rays[square]:
+            line = 0
+            for cell in ray:
+                if cell & opp:
+                    line |= cell
+                else:
+                    if cell & own:
+                        flips |= line
+                    break
+        if flips:
+            moves[coords[square]] = flips
+
+    return moves
+
+def move_flips_in_order(own, opp, geometry=STANDARD):
+    # Same as move_flips but with the flipped squares of each move in flips_in_order order, for the list grid
+    coords = geometry.coords
+    rays = geometry.rays
+    candidates = neighbours(opp, geometry) & ~(own | opp)
+    moves = {}
+
+    while candidates:
+        low = candidates & -candidates
+        candidates ^= low
+        square = low.bit_length() - 1
+        flips = []
+        for ray in rays[square]:
+            line = []
+            for cell in ray:
+                if cell & opp:
+                    line.append(cell.bit_length() - 1)
+                else:
+                    if cell & own:
+                        flips.extend(line)
+                    break
+        if flips:
+            moves[coords[square]] = flips
+
+    return moves
+
+def flips_in_order(own, opp, square, geometry=STANDARD):
+    # Same as flips_mask but returns the flipped squares walked outwards per direction (matches the grid functions' ordering)
+    flips = []
+
+    for ray in geometry.rays[square]:
+        line = []
+        for cell in ray:
+            if cell & opp:
+                line.append(cell.bit_length() - 1)
+            else:
+                if cell & own:
+                    flips.extend(line)
+                break
+
+    return flips
+
+def is_pattern(sBits, oBits, index, geometry=STANDARD):
+    # SOS or OSO on the line
+    ends, middle = geometry.patternMasks[index]
+    return ((sBits & ends) == ends and oBits & middle) or ((oBits & ends) == ends and sBits & middle)
+
+def count_patterns(sBits, oBits, changed, geometry=STANDARD):
+    # Number of SOS/OSO lines passing through at least one of the changed squares
+    lineSets = geometry.lineSets
+    candidates = 0
+    while changed:
+        low = changed & -changed
+        candidates |= lineSets[low.bit_length() - 1]
+        changed ^= low
+
+    patternMasks = geometry.patternMasks
+    count = 0
+    while candidates:
+        low = candidates & -candidates
+        ends, middle = patternMasks[low.bit_length() - 1]
+        if ((sBits & ends) == ends and oBits & middle) or ((oBits & ends) == ends and sBits & middle):
+            count += 1
+        candidates ^= low
+
+    return count
@@ -0,0 +1,83 @@
+import argparse
+import multiprocessing
+import os
+import time
+from bitboard import grid_to_bitboards
+from rules import GameState
+from ai_player import ComputerPlayer, BoardState
+from opening_book import BOOK_PATH, SYMMETRIES, INVERSE_SYMMETRIES, book_key, write_book
+
+# Builds the opening book read by opening_book.OpeningBook
+# For each side the book plays, the tree of the first plies is walked breadth first: where that side is to move only its
+# best move (searched to --depth) is followed, where the other side is to move every reply is. Positions that are the same
+# up to symmetry are searched once. The searches of one ply run in parallel.
+#
+# Example:
+#   python build_book.py --plies 8 --depth 8
+
+def search_job(job):
+    # Runs in a worker process: (move, score) of a deep search of one position
+    grid, player, sPatternScore, oPatternScore, depth = job
+    computerPlayer = ComputerPlayer(player, depth, BoardState(grid, sPatternScore, oPatternScore))
+    move, stats = computerPlayer.get_best_move_with_stats()
+    return move, stats.score
+
+def position_key(state):
+    sBits, oBits = grid_to_bitboards(state.gridLogic)
+    return book_key(sBits, oBits, state.currentPlayer, state.sPatternScore, state.oPatternScore)
+
+def build_book(plies, depth, sides, workers):
+    entries = {} # key -> (canonical move square, depth, score)
+    frontiers = {side: [GameState()] for side in sides} # Positions at the current ply of the tree of each book side
+
+    with multiprocessing.Pool(workers) as pool:
+        for ply in range(plies):
+            # Search every new book position of this ply at once
+            toSearch = {}
+            for side, frontier in frontiers.items():
+                for state in frontier:
+                    if state.currentPlayer == side:
+                        key, symmetry = position_key(state)
+                        if key not in entries and key not in toSearch:
+                            toSearch[key] = (state, symmetry)
+
+            start = time.perf_counter()
+            jobs = [(state.gridLogic, state.currentPlayer, state.sPatternScore, state.oPatternScore, depth) for state, _ in toSearch.values()]
+            for (key, (state, symmetry)), (move, score) in zip(toSearch.items(), pool.map(search_job, jobs)):
+                entries[key] = (SYMMETRIES[symmetry][move[0] * 8 + move[1]], depth, score)
+            print(f"Ply {ply + 1}/{plies}: {len(toSearch)} positions searched in {time.perf_counter() - start:.1f} s, {len(entries)} in the book", flush=True)
+
+            # Next ply: the book move on the book side's turns, every move on the other side's
+            for side, frontier in frontiers.items():
+                nextFrontier = {}
+                for state in frontier:
+                    if state.currentPlayer == side:
+                        key, symmetry = position_key(state)
+                        moves = [divmod(INVERSE_SYMMETRIES[symmetry][entries[key][0]], 8)]
+                    else:
+                        moves = state.validMoves
+                    for move in moves:
+                        child = state.copy()
+                        child.play_move(*move)
+                        if not child.gameOver:
+                            nextFrontier.setdefault(position_key(child)[0], child) # Transpositions and symmetric positions are walked once
+                frontiers[side] = list(nextFrontier.values())
+
+    return entries
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Build the FlipSOS opening book.')
+    parser.add_argument('--plies', type=int, default=8, help='number of plies covered by the book (default: 8)')
+    parser.add_argument('--depth', type=int, default=8, help='search depth of every book move (default: 8)')
+    parser.add_argument('--sides', choices=('S', 'O', 'SO'), default='SO', help='sides the book plays for (default: both)')
+    parser.add_argument('--workers', '-j', type=int, default=os.cpu_count(), help='parallel searches (default: all cores)')
+    parser.add_argument('--output', '-o', default=BOOK_PATH, help=f'book file (default: {BOOK_PATH})')
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    entries = build_book(args.plies, args.depth, args.sides, max(1, args.workers))
+    write_book(args.output, entries, args.depth, args.plies)
+    print(f"Wrote {len(entries)} positions to {args.output} in {time.perf_counter() - start:.1f} s")
+
+if __name__ == '__main__':
+    main()
@@ -1,4 +1,5 @@
 import pygame
+from asset_manager import load_font
 
 class Button:
     def __init__(self, x, y, width, height, text, main_color, hover_color, text_color, font_name='assets/game_font.ttf', font_size=30):
@@ -7,39 +8,57 @@ class Button:
         self.text_color = text_color
         self.main_color = main_color
         self.hover_color = hover_color
-        self.current_color = main_color
         self.is_hovered = False
 
         try:
-            self.font = pygame.font.Font(font_name, font_size)
+            self.font = load_font(font_name, font_size)
         except FileNotFoundError:
             print(f"Warning: Font '{font_name}' not found. Falling back to default font.")
-            self.font = pygame.font.Font(None, font_size)
+            self.font = load_font(None, font_size)
 
         self.text_surf = self.font.render(text, True, self.text_color)
         self.text_rect = self.text_surf.get_rect(center=self.rect.center)
 
-        # For smooth hover animation
+        # Prerendered shadow and faces (button in its color with the text), draw only blits them
+        self.shadow_offset = 4
+        self.shadow_surf = pygame.Surface(self.rect.size, pygame.SRCALPHA)
+        pygame.draw.rect(self.shadow_surf, (0, 0, 0, 50), self.shadow_surf.get_rect(), border_radius=12)
+        self.main_face = self._render_face(main_color)
+        self.hover_face = self._render_face(hover_color)
+
+        # For smooth hover animation: how far the button has faded from the main to the hover face (0 to 1)
+        self.hover_amount = 0.0
         self.color_transition_speed = 10
 
     def draw(self, surface):
         # Smooth color transition on hover
-        target_color = self.hover_color if self.is_hovered else self.main_color
-        self.current_color = self._interpolate_color(self.current_color, target_color, self.color_transition_speed)
+        target_amount = 1.0 if self.is_hovered else 0.0
+        self.hover_amount += (target_amount - self.hover_amount) / self.color_transition_speed
+        if abs(target_amount - self.hover_amount) < 1 / 255:
+            self.hover_amount = target_amount
 
         # Draw shadow
-        shadow_offset = 4
-        shadow_color = (0, 0, 0, 50)
-        shadow_surface = pygame.Surface((self.rect.width, self.rect.height), pygame.SRCALPHA)
-        pygame.draw.rect(shadow_surface, shadow_color, shadow_surface.get_rect(), border_radius=12)
-        surface.blit(shadow_surface, (self.rect.x + shadow_offset, self.rect.y + shadow_offset))
+        surface.blit(self.shadow_surf, (self.rect.x + self.shadow_offset, self.rect.y + self.shadow_offset))
 
-        # Draw button
-        pygame.draw.rect(surface, self.current_color, self.rect, border_radius=12)
+        # Draw button, blending the hover face over the main face while the color changes
+        if self.hover_amount == 1.0:
+            surface.blit(self.hover_face, self.rect)
+        else:
+            surface.blit(self.main_face, self.rect)
+            if self.hover_amount > 0.0:
+                self.hover_face.set_alpha(int(self.hover_amount * 255))
+                surface.blit(self.hover_face, self.rect)
+                self.hover_face.set_alpha(255)
 
-        # Render and center text
-        self.text_rect = self.text_surf.get_rect(center=self.rect.center)
-        surface.blit(self.text_surf, self.text_rect)
+    def is_fading(self):
+        # Whether the hover transition is still running, draw has to be called every frame until it ends
+        return self.hover_amount != (1.0 if self.is_hovered else 0.0)
+
+    def _render_face(self, color):
+        face = pygame.Surface(self.rect.size, pygame.SRCALPHA)
+        pygame.draw.rect(face, color, face.get_rect(), border_radius=12)
+        face.blit(self.text_surf, self.text_surf.get_rect(center=face.get_rect().center))
+        return face
 
     def check_hover(self, mouse_pos):
         self.is_hovered = self.rect.collidepoint(mouse_pos)
@@ -47,5 +66,3 @@ class Button:
     def check_click(self, event):
         return event.type == pygame.MOUSEBUTTONDOWN and event.button == 1 and self.rect.collidepoint(event.pos)
 
-    def _interpolate_color(self, current, target, speed):
-        return tuple(int(c + (t - c) / speed) for c, t in zip(current, target))
@@ -0,0 +1,151 @@
+from bitboard import STANDARD, iter_bits, valid_moves_mask, flips_mask, count_patterns
+
+# Exact endgame solver
+# With few empty squares left the search can reach the end of every line, so instead of the evaluation it scores the final
+# margin: tokens + pattern score of the player to move minus the opponent's, the totals get_reward compares.
+# The patterns still to come do not depend on the pattern scores so far, so the search only scores the rest of the game
+# (final token difference + patterns formed from here on) and the current pattern difference is added at the root.
+# That makes results reusable across pattern scores, they are kept in a table keyed by the boards.
+# Negamax alpha-beta with integer scores, so every move after the first can be tested with a null window.
+# Moves are ordered fastest-first (fewest opponent replies) while there are enough empty squares for it to pay off,
+# otherwise by parity: moves in quadrants with an odd number of empty squares first, so the player to move tends to get
+# the last move in each region.
+
+ENDGAME_EMPTIES = 10 # ComputerPlayer switches to the solver at this many empty squares
+FASTEST_FIRST_EMPTIES = 6 # Below this, counting the replies to every move costs more than the better ordering saves
+PVS_EMPTIES = 5 # Null-window re-searches only pay off when there is a subtree to prune
+TABLE_EMPTIES = 4 # Results of nodes with fewer empty squares are cheaper to search again than to store
+STOP_CHECK_INTERVAL = 1024 # Nodes between two calls of the stop check (cancel, deadline)
+INFINITY = 1 << 20 # Above any margin (every token plus every pattern on the board)
+
+class EndgameSolver:
+    def __init__(self, stopCheck=None, geometry=STANDARD):
+        self.stopCheck = stopCheck # Called every STOP_CHECK_INTERVAL nodes, raises to abort the solve
+        self.geometry = geometry # bitboard.BoardGeometry of the board size
+        self.nodes = 0
+        self.table = {} # (own, opp, sToMove) -> (lower bound, upper bound, best move square)
+
+    def solve(self, own, opp, sToMove, patternDiff, exact=True):
+        # Returns (best move, final margin) for the player to move, patternDiff is its pattern score minus the opponent's
+        # With exact=False only win/draw/loss is decided, the margin is then only right in sign (faster)
+        alpha, beta = (-INFINITY, INFINITY) if exact else (-patternDiff - 1, -patternDiff + 1)
+        bestMove, bestScore = None, -INFINITY
+
+        for index, (square, flips) in enumerate(self.order_moves(own, opp, valid_moves_mask(own, opp, self.geometry), None)):
+            newOwn, newOpp, gained = self.play(own, opp, sToMove, square, flips)
+            if index == 0:
+                score = gained - self.search(newOpp, newOwn, not sToMove, gained - beta, gained - alpha)
+            else:
+                score = gained - self.search(newOpp, newOwn, not sToMove, gained - alpha - 1, gained - alpha)
+                if alpha < score < beta:
+                    score = gained - self.search(newOpp, newOwn, not sToMove, gained - beta, gained - score)
+
+            if score > bestScore:
+                bestMove, bestScore = self.geometry.coords[square], score
+                if score > alpha:
+                    alpha = score
+                    if alpha >= beta:
+                        break
+
+        return bestMove, bestScore + patternDiff
+
+    def play(self, own, opp, sToMove, square, flips):
+        # Returns the boards after the move and the number of patterns it formed
+        changed = flips | (1 << square)
+        newOwn = own | changed
+        newOpp = opp ^ flips
+        gained = count_patterns(newOwn, newOpp, changed, self.geometry) if sToMove else count_patterns(newOpp, newOwn, changed, self.geometry)
+        return newOwn, newOpp, gained
+
+    def order_moves(self, own, opp, moves, firstSquare):
+        # (square, flips) of every move, firstSquare (the table's best move) first then the most promising
+        geometry = self.geometry
+        empty = ~(own | opp) & geometry.fullBoard
+        oddRegions = 0
+        for quadrant in geometry.quadrants:
+            if (empty & quadrant).bit_count() & 1:
+                oddRegions |= quadrant
+
+        ordered = []
+        if firstSquare is not None:
+            ordered.append((firstSquare, flips_mask(own, opp, firstSquare, geometry)))
+            moves &= ~(1 << firstSquare)
+
+        if empty.bit_count() >= FASTEST_FIRST_EMPTIES:
+            scored = []
+            for square in iter_bits(moves):
+                flips = flips_mask(own, opp, square, geometry)
+                replies = valid_moves_mask(opp ^ flips, own | flips | (1 << square), geometry).bit_count()
+                scored.append((2 * replies + (0 if oddRegions >> square & 1 else 1), square, flips))
+            scored.sort()
+            ordered.extend((square, flips) for _, square, flips in scored)
+            return ordered
+
+        for square in iter_bits(moves & oddRegions):
+            ordered.append((square, flips_mask(own, opp, square, geometry)))
+        for square in iter_bits(moves & ~oddRegions):
+            ordered.append((square, flips_mask(own, opp, square, geometry)))
+        return ordered
+
+    def search(self, own, opp, sToMove, alpha, beta):
+        # Margin of the rest of the game for the player to move (own) under perfect play, fail-soft within (alpha, beta)
+        self.nodes += 1
+        if self.stopCheck is not None and not self.nodes % STOP_CHECK_INTERVAL:
+            self.stopCheck()
+
+        geometry = self.geometry
+        moves = valid_moves_mask(own, opp, geometry)
+        if not moves:
+            if not valid_moves_mask(opp, own, geometry): # Both players skip, the game is over
+                return own.bit_count() - opp.bit_count()
+            return -self.search(opp, own, not sToMove, -beta, -alpha)
+
+        empty = ~(own | opp) & geometry.fullBoard
+        if empty == moves and not moves & (moves - 1):
+            # Last empty square and it is playable: the move fills the board and ends the game
+            square = moves.bit_length() - 1
+            newOwn, newOpp, gained = self.play(own, opp, sToMove, square, flips_mask(own, opp, square, geometry))
+            return newOwn.bit_count() - newOpp.bit_count() + gained
+
+        emptyCount = empty.bit_count()
+        key = None
+        bestSquare = None
+        if emptyCount >= TABLE_EMPTIES:
+            key = (own, opp, sToMove)
+            entry = self.table.get(key)
+            if entry is not None:
+                lower, upper, bestSquare = entry
+                if lower >= beta or lower == upper:
+                    return lower
+                if upper <= alpha:
+                    return upper
+                alpha, beta = max(alpha, lower), min(beta, upper)
+
+        alphaOrig = alpha
+        usePvs = emptyCount >= PVS_EMPTIES
+        bestScore = -INFINITY
+        for index, (square, flips) in enumerate(self.order_moves(own, opp, moves, bestSquare)):
+            newOwn, newOpp, gained = self.play(own, opp, sToMove, square, flips)
+            if index == 0 or not usePvs:
+                score = gained - self.search(newOpp, newOwn, not sToMove, gained - beta, gained - alpha)
+            else:
+                score = gained - self.search(newOpp, newOwn, not sToMove, gained - alpha - 1, gained - alpha)
+                if alpha < score < beta:
+                    score = gained - self.search(newOpp, newOwn, not sToMove, gained - beta, gained - score)
+
+            if score > bestScore:
+                bestScore, bestSquare = score, square
+                if score > alpha:
+                    alpha = score
+                    if alpha >= beta:
+                        break
+
+        if key is not None:
+            if bestScore <= alphaOrig:
+                self.table[key] = (-INFINITY, bestScore, bestSquare)
+            elif bestScore >= beta:
+                self.table[key] = (bestScore, INFINITY, bestSquare)
+            else:
+                self.table[key] = (bestScore, bestScore, bestSquare)
+
+        return bestScore
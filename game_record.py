@@ -0,0 +1,194 @@
+import argparse
+import mmap
+import os
+import struct
+import time
+from array import array
+from bitboard import board_geometry, valid_moves_mask, flips_mask, count_patterns
+
+# Game records: the moves of finished games, one byte each, appended to a file for analysis and training
+# A move is stored as its square (row * size + col). A turn skipped because the player had no valid move is stored as the
+# square of the top left starting token, which is never empty and so never a move (every square of a 16x16 board is
+# needed for the moves). The game ending because both players are stuck is not stored, the header has the result.
+#
+# File layout (little endian):
+#   header  magic (8 bytes), version (u16), padding (2 bytes)
+#   games   board size (u8), result (u8, same codes as Grid.gameOver), S tokens, O tokens, S patterns, O patterns and
+#           move count (u16 each), then the moves (u8 each)
+# Games are only ever appended, so one file can collect the games of many sessions. Opening a file maps it and hops over
+# the game headers once to find where each game starts, games can then be indexed without decoding any moves.
+#
+# Example:
+#   python game_record.py games.bin   (summary of the games in the file, every game is replayed to check it)
+
+RECORD_MAGIC = b'FSOSGAME'
+RECORD_VERSION = 1
+FILE_HEADER = struct.Struct('<8sHxx')
+GAME_HEADER = struct.Struct('<BBHHHHH')
+
+def pass_square(size):
+    # Square stored for a skipped turn
+    half = size // 2
+    return (half - 1) * size + half - 1
+
+class GameRecord:
+    def __init__(self, size, moves=b'', result=0, scores=(0, 0, 0, 0)):
+        self.size = size
+        self.moves = bytearray(moves) # One square per move, pass_square(size) for a skipped turn
+        self.result = result # 0 = unfinished, 1 = S wins, 2 = O wins, 3 = Draw
+        self.sScore, self.oScore, self.sPatternScore, self.oPatternScore = scores
+        self.passSquare = pass_square(size)
+
+    def __len__(self):
+        return len(self.moves)
+
+    def add_move(self, x, y):
+        self.moves.append(x * self.size + y)
+
+    def add_pass(self):
+        self.moves.append(self.passSquare)
+
+    def finish(self, game):
+        # Copies the result and final scores of a Grid or GameState
+        self.result = game.gameOver
+        self.sScore, self.oScore = game.sScore, game.oScore
+        self.sPatternScore, self.oPatternScore = game.sPatternScore, game.oPatternScore
+
+    def iter_moves(self):
+        # (row, col) of every move, None for a skipped turn
+        for square in self.moves:
+            yield None if square == self.passSquare else divmod(square, self.size)
+
+    def pack(self):
+        return GAME_HEADER.pack(self.size, self.result, self.sScore, self.oScore, self.sPatternScore, self.oPatternScore, len(self.moves)) + self.moves
+
+def play_recorded(state, record, x, y):
+    # Plays a move on a rules.GameState and records it, along with the opponent's skipped turn if it has to skip
+    player = state.currentPlayer
+    patternScore = state.play_move(x, y)
+    record.add_move(x, y)
+    if state.currentPlayer == player and not state.gameOver:
+        record.add_pass()
+    return patternScore
+
+def replay(record):
+    # Plays the record on bitboards, yields (sBits, oBits, player to move, S patterns, O patterns, move square) before
+    # every move. Raises ValueError if a move is invalid, a turn is skipped with valid moves left or the final scores
+    # differ from the header.
+    geometry = board_geometry(record.size)
+    passSquare = record.passSquare
+    sBits = oBits = 0
+    for (x, y), token in geometry.startTokens:
+        if token == 'S':
+            sBits |= 1 << (x * record.size + y)
+        else:
+            oBits |= 1 << (x * record.size + y)
+    player = 'S'
+    patternScores = {'S': 0, 'O': 0}
+
+    for ply, square in enumerate(record.moves):
+        own, opp = (sBits, oBits) if player == 'S' else (oBits, sBits)
+        moves = valid_moves_mask(own, opp, geometry)
+        if square == passSquare:
+            if moves:
+                raise ValueError(f"Move {ply + 1}: player {player} skipped a turn with valid moves")
+            player = 'O' if player == 'S' else 'S'
+            continue
+        if not moves >> square & 1:
+            raise ValueError(f"Move {ply + 1}: invalid move {divmod(square, record.size)} for player {player}")
+
+        yield sBits, oBits, player, patternScores['S'], patternScores['O'], square
+
+        changed = flips_mask(own, opp, square, geometry) | (1 << square)
+        own, opp = own | changed, opp & ~changed
+        sBits, oBits = (own, opp) if player == 'S' else (opp, own)
+        patternScores[player] += count_patterns(sBits, oBits, changed, geometry)
+        player = 'O' if player == 'S' else 'S'
+
+    final = (sBits.bit_count(), oBits.bit_count(), patternScores['S'], patternScores['O'])
+    if record.result and final != (record.sScore, record.oScore, record.sPatternScore, record.oPatternScore):
+        raise ValueError(f"Final scores {final} differ from the recorded {(record.sScore, record.oScore, record.sPatternScore, record.oPatternScore)}")
+
+def append_games(path, records):
+    # Appends the records to the file at path, creating it if needed
+    with open(path, 'ab+') as recordFile:
+        recordFile.seek(0, os.SEEK_END)
+        if recordFile.tell() == 0:
+            recordFile.write(FILE_HEADER.pack(RECORD_MAGIC, RECORD_VERSION))
+        else:
+            recordFile.seek(0)
+            header = recordFile.read(FILE_HEADER.size)
+            if len(header) != FILE_HEADER.size or FILE_HEADER.unpack(header) != (RECORD_MAGIC, RECORD_VERSION):
+                raise ValueError(f"{path}: not a game record file (or a different version)")
+            recordFile.seek(0, os.SEEK_END)
+        recordFile.write(b''.join(record.pack() for record in records))
+
+class GameRecords:
+    def __init__(self, path):
+        with open(path, 'rb') as recordFile:
+            self.data = mmap.mmap(recordFile.fileno(), 0, access=mmap.ACCESS_READ) # The mapping stays valid after the file is closed
+
+        if len(self.data) < FILE_HEADER.size or FILE_HEADER.unpack_from(self.data, 0) != (RECORD_MAGIC, RECORD_VERSION):
+            raise ValueError(f"{path}: not a game record file (or a different version)")
+
+        # Offset of every game's header
+        self.offsets = array('Q')
+        offset, end = FILE_HEADER.size, len(self.data)
+        unpack, headerSize = GAME_HEADER.unpack_from, GAME_HEADER.size
+        while offset < end:
+            if offset + headerSize > end:
+                raise ValueError(f"{path}: truncated game header at byte {offset}")
+            self.offsets.append(offset)
+            offset += headerSize + unpack(self.data, offset)[6]
+        if offset != end:
+            raise ValueError(f"{path}: truncated moves in the last game")
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def __getitem__(self, index):
+        offset = self.offsets[index]
+        size, result, sScore, oScore, sPatternScore, oPatternScore, count = GAME_HEADER.unpack_from(self.data, offset)
+        start = offset + GAME_HEADER.size
+        return GameRecord(size, self.data[start:start + count], result, (sScore, oScore, sPatternScore, oPatternScore))
+
+    def __iter__(self):
+        for index in range(len(self.offsets)):
+            yield self[index]
+
+    def close(self):
+        self.data.close()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Summarise and check a FlipSOS game record file.')
+    parser.add_argument('path', help='game record file')
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    try:
+        records = GameRecords(args.path)
+    except (OSError, ValueError) as e:
+        parser.error(str(e))
+    loadTime = time.perf_counter() - start
+
+    start = time.perf_counter()
+    results = [0, 0, 0, 0]
+    sizes = {}
+    positions = 0
+    for index, record in enumerate(records):
+        try:
+            positions += sum(1 for _ in replay(record))
+        except ValueError as e:
+            parser.error(f"Game {index}: {e}")
+        results[record.result] += 1
+        sizes[record.size] = sizes.get(record.size, 0) + 1
+    replayTime = time.perf_counter() - start
+
+    boards = ', '.join(f"{count} on {size}x{size}" for size, count in sorted(sizes.items()))
+    print(f"{len(records)} games ({boards}), {positions} positions, loaded in {1000 * loadTime:.1f} ms")
+    print(f"S wins: {results[1]}   O wins: {results[2]}   Draws: {results[3]}   Unfinished: {results[0]}")
+    if replayTime:
+        print(f"Replayed in {replayTime:.2f} s ({positions / replayTime:,.0f} positions/s)")
+
+if __name__ == '__main__':
+    main()
@@ -1,174 +1,13 @@
 import pygame
 from sos_token import Token
-
-# Utility Functions
-def load_image(path, size):
-    img = pygame.image.load(path).convert_alpha() # To make png transparent
-    img = pygame.transform.scale(img, size)
-    return img
-
-def extract_sprite(sheet, x, y, scaleSize, size):
-    # Extract a sprite from a sprite sheet
-    sprite = pygame.Surface((size[0], size[1])).convert_alpha() # size parameter is the size of each sprite in the sheet
-    sprite.blit(sheet, (0, 0), (x * size[0], y * size[1], size[0], size[1])) 
-    sprite = pygame.transform.scale(sprite, scaleSize)
-    return sprite
-
-def find_valid_directions(x, y, minX=0, minY=0, maxX=7, maxY=7):
-    # Returns a list of valid directions to move in the grid (Basically, directions that doesn't get out of bounds)
-    validDirections = []
-    
-    if y != minY: validDirections.append((x, y - 1)) # Up
-    if x != maxX and y != minY: validDirections.append((x + 1, y - 1)) # Up-right
-    if x != maxX: validDirections.append((x + 1, y)) # Right
-    if x != maxX and y != maxY: validDirections.append((x + 1, y + 1)) # Down-right
-    if y != maxY: validDirections.append((x, y + 1)) # Down
-    if x != minX and y != maxY: validDirections.append((x - 1, y + 1)) # Down-left
-    if x != minX: validDirections.append((x - 1, y)) # Left
-    if x != minX and y != minY: validDirections.append((x - 1, y - 1)) # Up-left
-                
-    return validDirections
-
-def find_clickable_cells(grid, player):
-    # Clickable cells are those that are empty and have at least one opponent token adjacent to it
-    clickableCells = []
-    
-    for gridX, row in enumerate(grid):
-        for gridY, col in enumerate(row):
-            # Skip occupied cells
-            if grid[gridX][gridY] != '-':
-                continue
-            
-            validDirections = find_valid_directions(gridX, gridY) # Get all directions that are within the grid
-            
-            for direction in validDirections:
-                dirX, dirY = direction
-                checkedCell = grid[dirX][dirY]
-                
-                # Find an opponent token in the direction
-                if checkedCell == '-' or checkedCell == player:
-                    continue
-                else:
-                    clickableCells.append((gridX, gridY))
-                    break
-                
-    return clickableCells
-    
-def find_swappable_tiles(x, y, grid, player):
-    surroundingCells = find_valid_directions(x, y)
-    
-    if len(surroundingCells) == 0:
-        return []
-    
-    swappableTiles = []
-    opposingPlayer = 'S' if player == 'O' else 'O'
-    
-    for checkedCell in surroundingCells:
-        cellX, cellY = checkedCell
-        difX, difY = cellX - x, cellY - y
-        currentLine = [] # List of all the swappable tiles if current cell is chosen as a move
-        checkingLine = True
-        
-        while checkingLine:
-            # If an opponent token is found, continue checking in the same direction until a player token is found or an empty cell is found
-            if grid[cellX][cellY] == opposingPlayer:
-                currentLine.append((cellX, cellY))
-            elif grid[cellX][cellY] == player:
-                checkingLine = False
-                break
-            elif grid[cellX][cellY] == '-':
-                currentLine.clear()
-                checkingLine = False
-                break
-            
-            # Move to the next cell in the direction
-            cellX += difX
-            cellY += difY
-            
-            # Check if the cell is within bounds
-            if cellX < 0 or cellX > 7 or cellY < 0 or cellY > 7:
-                currentLine.clear()
-                checkingLine = False
-                break
-            
-        if len(currentLine) > 0:
-            swappableTiles.extend(currentLine)
-                
-    if len(swappableTiles) > 0:
-        swappableTiles.append((x, y))
-        
-    return swappableTiles
-                
-def find_valid_moves(grid, player):
-    # Valid move is a cell that is empty and has at least one opponent token adjacent to it, and has at least one swappable tile in the direction of the move
-    clickableCells = find_clickable_cells(grid, player)
-    validMoves = []
-    
-    for cell in clickableCells:
-        x, y = cell
-        
-        swappableTiles = find_swappable_tiles(x, y, grid, player)
-        
-        if len(swappableTiles) > 0:
-            validMoves.append(cell)
-            
-    return validMoves
-
-def calculate_score(grid):
-    # Calculate the score of each player
-    sScore = 0
-    oScore = 0
-    
-    for row in grid:
-        for cell in row:
-            if cell == 'S':
-                sScore += 1
-            elif cell == 'O':
-                oScore += 1
-        
-    return sScore, oScore
-
-def is_on_grid(x, y, minX=0, minY=0, maxX=7, maxY=7):
-    # Check if the coordinates are within the grid bounds
-    return minX <= x <= maxX and minY <= y <= maxY
-
-def find_patterns(grid, swappableTiles):
-        directions = [
-            (0, 1),   # horizontal right
-            (1, 0),   # vertical down
-            (1, 1),   # diagonal down-right
-            (1, -1),  # diagonal down-left
-        ]
-        patterns = []
-        seenPatterns = set()
-        
-        for cx, cy in swappableTiles:
-            for dx, dy in directions:
-                # Check 3-cell patterns in each direction of the current cell
-                for offset in [-2, -1, 0]:
-                    coordinates = [
-                        (cx + dx * offset, cy + dy * offset),
-                        (cx + dx * (offset + 1), cy + dy * (offset + 1)),
-                        (cx + dx * (offset + 2), cy + dy * (offset + 2))
-                    ]
-                    
-                    # Validate bounds
-                    if not all(is_on_grid(cdx, cdy) for cdx, cdy in coordinates):
-                        continue
-                    
-                    # Get pattern string (SOS or OSO)
-                    pattern = [grid[cdx][cdy] for cdx, cdy in coordinates]
-                    if pattern == ['S', 'O', 'S'] or pattern == ['O', 'S', 'O']:
-                        key = frozenset(coordinates)  # Used frozenset to avoid duplicates
-                        if key not in seenPatterns:
-                            seenPatterns.add(key)
-                            patterns.append(coordinates)       
-                            
-        return patterns 
+from render_cache import render_text
+from asset_manager import load_image, load_sprite, load_font, composed
+from game_record import GameRecord, append_games
+from rules import *
 
 # Handles the grid design and logic       
 class Grid:
-    def __init__(self, rows, columns, tokenSize, playerToken, gameClass): 
+    def __init__(self, rows, columns, tokenSize, playerToken, gameClass, recordPath=None): 
         self.gameClass = gameClass
         self.playerToken = playerToken
         self.y = rows
@@ -181,22 +20,22 @@ class Grid:
         self.playerS = 'S'
         self.currentPlayer = 'S'
 
-        # Load images ONCE
+        # Shared with every other Grid (see asset_manager), only the first game of a board size loads anything
         self.sTokenImg = load_image('assets/S.png', self.resizedToken)
         self.oTokenImg = load_image('assets/O.png', self.resizedToken)
         self.validToken = load_image('assets/Valid_Moves.png', self.validTokenSize)
         self.sidebar = load_image('assets/Sidebar.png', (360, 720))
-        self.scoreFont = pygame.font.Font('assets/arial.ttf', 40)
-        self.stateFont = pygame.font.Font('assets/arial.ttf', 28)
+        self.scoreFont = load_font('assets/arial.ttf', 40)
+        self.stateFont = load_font('assets/arial.ttf', 28)
 
-        self.bgDict = self.load_background_images()
-        self.bg = self.create_background()
+        self.bg = composed(('background', self.y, self.x, self.tokenSize), self.create_background)
         self.gridLogic = self.regen_grid(self.y, self.x)
         
         self.stateText = [f"PLAYER {self.currentPlayer}", "TURN"]
         self.sScore, self.oScore = calculate_score(self.gridLogic)
         self.sPatternScore, self.oPatternScore = 0, 0
-        self.validMoves = find_valid_moves(self.gridLogic, self.currentPlayer)
+        self.moveFlips = find_move_flips(self.gridLogic, self.currentPlayer) # Tiles each valid move flips, kept until the next turn
+        self.validMoves = list(self.moveFlips)
         self.lastMove = None
         self.pattern = []
         self.bothSkipped = False
@@ -204,41 +43,42 @@ class Grid:
 
         # Animation tracking
         self.animating_tokens = []
+
+        # Moves of the game, appended to the file at recordPath when the game ends (see game_record)
+        self.record = GameRecord(rows)
+        self.recordPath = recordPath
+
+        # Rendering (see draw_changes): sidebar text areas and what the last drawn frame showed
+        sidebarRight = 720 + self.sidebar.get_width()
+        self.scoreRects = (pygame.Rect(870, 379, sidebarRight - 870, self.scoreFont.get_linesize()),
+                           pygame.Rect(870, 490, sidebarRight - 870, self.scoreFont.get_linesize()))
+        self.stateRect = pygame.Rect(767, 582, 267, 121) # Background box of the state text
+        self.staticLayer = None # Created on the first draw, it needs the display's size and pixel format
+        self.fullRedraw = True
+        self.pendingRects = []
+        self.drawnTokens = set()
+        self.drawnFlipping = {}
+        self.drawnMarkers = frozenset()
+        self.drawnLastMove = None
+        self.drawnPattern = []
+        self.drawnScores = None
+        self.drawnStateText = None
         
-    def load_background_images(self):
-        # Load background images for the grid 
-        # Extracts the images from the sprite sheet and scales them to the token size
-        imageDict = {}
-        xAlpha = ['A', 'B', 'C', 'D', 'E', 'F', 'G']
-        spriteSheet = pygame.image.load('assets/Sprite Sheet.png').convert_alpha()
-        spriteActualSize = (192, 192)
-        
-        for y in range(3):
-            for x in range(7):
-                imageDict[xAlpha[x] + str(y)] = extract_sprite(spriteSheet, x, y, self.tokenSize, spriteActualSize)
-        
-        return imageDict
-    
     def create_background(self):
-        # Create the background for the grid using the loaded images (specific for 8x8 grid)
-        gridBg = [
-            ['C0', 'D0', 'D0', 'D0', 'D0', 'D0', 'D0', 'D0', 'D0', 'E0'],
-            ['C1', 'A0', 'B0', 'F0', 'B0', 'F0', 'B0', 'F0', 'G0', 'E1'],
-            ['C1', 'B0', 'F0', 'B0', 'F0', 'B0', 'F0', 'B0', 'F0', 'E1'],
-            ['C1', 'F0', 'B0', 'F0', 'B0', 'F0', 'B0', 'F0', 'B0', 'E1'],
-            ['C1', 'B0', 'F0', 'B0', 'F0', 'B0', 'F0', 'B0', 'F0', 'E1'],
-            ['C1', 'F0', 'B0', 'F0', 'B0', 'F0', 'B0', 'F0', 'B0', 'E1'],
-            ['C1', 'B0', 'F0', 'B0', 'F0', 'B0', 'F0', 'B0', 'F0', 'E1'],
-            ['C1', 'F0', 'B0', 'F0', 'B0', 'F0', 'B0', 'F0', 'B0', 'E1'],
-            ['C1', 'A2', 'F0', 'B0', 'F0', 'B0', 'F0', 'B0', 'G2', 'E1'],
-            ['C2', 'D2', 'D2', 'D2', 'D2', 'D2', 'D2', 'D2', 'D2', 'E2'],
-        ]
+        # Create the background for the grid from the sprite sheet's tiles: a border around a checkerboard of tiles,
+        # the four corner tiles of the board have their own sprites
+        gridBg = [['C0'] + ['D0'] * self.x + ['E0']]
+        for y in range(self.y):
+            gridBg.append(['C1'] + ['B0' if (x + y) % 2 else 'F0' for x in range(self.x)] + ['E1'])
+        gridBg.append(['C2'] + ['D2'] * self.x + ['E2'])
+        gridBg[1][1], gridBg[1][self.x], gridBg[self.y][1], gridBg[self.y][self.x] = 'A0', 'G0', 'A2', 'G2'
+
         background = pygame.Surface(((self.x + 2) * self.tokenSize[0], (self.y + 2) * self.tokenSize[1])).convert_alpha()
         background.set_colorkey('Black')
         
         for y, row in enumerate(gridBg):
             for x, sprite in enumerate(row):
-                background.blit(self.bgDict[sprite], (x * self.tokenSize[0], y * self.tokenSize[1]))
+                background.blit(load_sprite(sprite, self.tokenSize), (x * self.tokenSize[0], y * self.tokenSize[1]))
         
         return background
     
@@ -262,71 +102,158 @@ class Grid:
                 line.append('-')
             grid.append(line)
 
-        # Add starting tokens
+        # Add starting tokens (on the centre 2x2 of the board)
         self.tokens.clear() # Clear existing tokens if regenerating
-        self.add_token(grid, 'O', 3, 3)
-        self.add_token(grid, 'S', 3, 4)
-        self.add_token(grid, 'O', 4, 4)
-        self.add_token(grid, 'S', 4, 3)
+        for (y, x), player in board_geometry(rows).startTokens:
+            self.add_token(grid, player, y, x)
 
         return grid
 
-    def draw_grid(self, displayWindow):
-        displayWindow.blit(self.bg, (0, 0))
-        
+    # Rendering
+    # The game screen is a static layer (white fill, board background, sidebar art) with the tokens, valid move markers,
+    # last move dot, pattern lines and sidebar texts drawn over it. draw_changes compares what those show now with what
+    # the last frame showed and only redraws (and returns) the rectangles that differ, so an idle board costs nothing.
+    def create_static_layer(self, resolution):
+        layer = pygame.Surface(resolution).convert()
+        layer.fill((255, 255, 255))
+        layer.blit(self.bg, (0, 0))
+        layer.blit(self.sidebar, (720, 0)) # Blit the sidebar to the right
+        return layer
+
+    def invalidate(self, rect=None):
+        # Redraw rect (or the whole screen) on the next draw_changes, for anything drawn over the game screen
+        if rect is None:
+            self.fullRedraw = True
+        else:
+            self.pendingRects.append(pygame.Rect(rect))
+
+    def cell_rect(self, cell):
+        y, x = cell
+        return pygame.Rect((x + 1) * self.tokenSize[0], (y + 1) * self.tokenSize[1], self.tokenSize[0], self.tokenSize[1])
+
+    def cell_center(self, cell):
+        y, x = cell
+        return x * self.tokenSize[0] + (self.tokenSize[0] * 3) // 2, y * self.tokenSize[1] + (self.tokenSize[1] * 3) // 2
+
+    def pattern_ends(self, pattern):
+        # Pixel coordinates of both ends of a pattern line (center of each tile)
+        pixel_coords = sorted(self.cell_center(cell) for cell in pattern)
+        return pixel_coords[0], pixel_coords[-1]
+
+    def pattern_rect(self, pattern):
+        (x1, y1), (x2, y2) = self.pattern_ends(pattern)
+        return pygame.Rect(min(x1, x2), min(y1, y2), abs(x2 - x1) + 1, abs(y2 - y1) + 1).inflate(2, 2)
+
+    def shown_markers(self):
         # Only draw valid move markers if it's the human player's ('S') turn
-        if self.currentPlayer == self.playerToken: # Or just use 'S' if it's always the human
-            # Draw valid move markers first (underneath tokens)
-            for move in self.validMoves:
-                displayWindow.blit(self.validToken, (move[1] * self.tokenSize[0] + self.tokenSize[0] + 2, move[0] * self.tokenSize[1] + self.tokenSize[1] + 2))
-        # Draw all tokens (animating tokens will draw themselves correctly)
-        for token in self.tokens.values():
-            token.draw(displayWindow)
+        return frozenset(self.validMoves) if self.currentPlayer == self.playerToken else frozenset()
+
+    def changed_rects(self):
+        # Rectangles whose content differs from the last drawn frame, updates the drawn state
+        changedCells = set()
+
+        # Tokens placed since the last frame, and tokens whose flip animation moved on or ended
+        if len(self.tokens) != len(self.drawnTokens):
+            changedCells.update(self.tokens.keys() - self.drawnTokens)
+            self.drawnTokens = set(self.tokens)
+        flipping = {(token.gridX, token.gridY): token.draw_state() for token in self.animating_tokens}
+        if flipping or self.drawnFlipping:
+            changedCells.update(cell for cell, state in self.drawnFlipping.items() if flipping.get(cell) != state)
+            changedCells.update(cell for cell, state in flipping.items() if self.drawnFlipping.get(cell) != state)
+            self.drawnFlipping = flipping
+
+        markers = self.shown_markers()
+        if markers != self.drawnMarkers:
+            changedCells.update(markers ^ self.drawnMarkers)
+            self.drawnMarkers = markers
+
+        if self.lastMove != self.drawnLastMove:
+            changedCells.update(cell for cell in (self.lastMove, self.drawnLastMove) if cell is not None)
+            self.drawnLastMove = self.lastMove
+
+        rects = [self.cell_rect(cell) for cell in changedCells]
+
+        pattern = [tuple(line) for line in self.pattern]
+        if pattern != self.drawnPattern:
+            rects.extend(self.pattern_rect(line) for line in pattern + self.drawnPattern)
+            self.drawnPattern = pattern
+
+        scores = (self.sScore, self.sPatternScore, self.oScore, self.oPatternScore)
+        if scores != self.drawnScores:
+            rects.extend(self.scoreRects)
+            self.drawnScores = scores
+
+        if self.stateText != self.drawnStateText:
+            rects.append(self.stateRect)
+            self.drawnStateText = list(self.stateText)
+
+        rects.extend(self.pendingRects)
+        self.pendingRects = []
+        return rects
+
+    def draw_changes(self, displayWindow):
+        # Brings the game screen on displayWindow up to date, returns the rectangles to pass to pygame.display.update
+        if self.staticLayer is None:
+            resolution = displayWindow.get_size()
+            self.staticLayer = composed(('static layer', self.y, self.x, self.tokenSize, resolution), lambda: self.create_static_layer(resolution))
+
+        rects = self.changed_rects() # Also run on a full redraw so the drawn state is up to date
+        if self.fullRedraw:
+            self.fullRedraw = False
+            rects = [displayWindow.get_rect()]
+
+        for rect in rects:
+            self.draw_area(displayWindow, rect)
+        return rects
+
+    def draw_area(self, displayWindow, rect):
+        # Redraws everything inside rect from the static layer up
+        displayWindow.set_clip(rect)
+        displayWindow.blit(self.staticLayer, rect, rect)
+
+        # Cells under rect: valid move markers (on empty cells) and tokens (animating tokens will draw themselves correctly)
+        markers = self.drawnMarkers
+        firstRow, lastRow = max(0, rect.top // self.tokenSize[1] - 1), min(self.y, (rect.bottom - 1) // self.tokenSize[1])
+        firstCol, lastCol = max(0, rect.left // self.tokenSize[0] - 1), min(self.x, (rect.right - 1) // self.tokenSize[0])
+        for y in range(firstRow, lastRow):
+            for x in range(firstCol, lastCol):
+                token = self.tokens.get((y, x))
+                if token is not None:
+                    token.draw(displayWindow)
+                elif (y, x) in markers:
+                    displayWindow.blit(self.validToken, (x * self.tokenSize[0] + self.tokenSize[0] + 2, y * self.tokenSize[1] + self.tokenSize[1] + 2))
 
         # Draw red circle on last clicked cell
         if self.lastMove:
-            y, x = self.lastMove
-            centerX = x * self.tokenSize[0] + (self.tokenSize[0] * 3) // 2
-            centerY = y * self.tokenSize[1] + (self.tokenSize[1] * 3) // 2
-            pygame.draw.circle(displayWindow, (255, 0, 0), (centerX, centerY), 5)  
-        
-        # Draw a line on each pattern formed
+            pygame.draw.circle(displayWindow, (255, 0, 0), self.cell_center(self.lastMove), 5)
+
+        # Draw a line on each pattern formed, from one end to the other
         for pattern in self.pattern:
-            # Convert grid coordinates to pixel coordinates (center of each tile)
-            pixel_coords = [
-                (px * self.tokenSize[0] + (self.tokenSize[0] * 3) // 2, py * self.tokenSize[1] + (self.tokenSize[1] * 3) // 2)
-                for (py, px) in pattern
-            ]
-            
-            # Ensure line is drawn from one end to the other
-            pixel_coords.sort()
-            
-            # Draw line from first to last point in the pattern
-            pygame.draw.line(displayWindow, (255, 0, 0), pixel_coords[0], pixel_coords[-1], 1)
-            
-    def draw_sidebar(self, displayWindow):
-        displayWindow.blit(self.sidebar, (720, 0)) # Blit the sidebar to the right
-        
+            start, end = self.pattern_ends(pattern)
+            pygame.draw.line(displayWindow, (255, 0, 0), start, end, 1)
+
+        if rect.collidelist(self.scoreRects) != -1 or rect.colliderect(self.stateRect):
+            self.draw_sidebar_text(displayWindow)
+
+        displayWindow.set_clip(None)
+
+    def draw_sidebar_text(self, displayWindow):
         # Draw overlay text
-        sScoreText = self.scoreFont.render(f"{self.sScore} + {self.sPatternScore}", True, (0, 0, 0))
-        oScoreText = self.scoreFont.render(f"{self.oScore} + {self.oPatternScore}", True, (0, 0, 0))
-        displayWindow.blit(sScoreText, (870, 379))
-        displayWindow.blit(oScoreText, (870, 490))
+        sScoreText = render_text(self.scoreFont, f"{self.sScore} + {self.sPatternScore}", (0, 0, 0))
+        oScoreText = render_text(self.scoreFont, f"{self.oScore} + {self.oPatternScore}", (0, 0, 0))
+        displayWindow.blit(sScoreText, self.scoreRects[0])
+        displayWindow.blit(oScoreText, self.scoreRects[1])
         
         # Assuming stateText is a list of strings
-        lineSurfaces = [self.stateFont.render(line, True, (0, 0, 0)) for line in self.stateText]
-
-        # Background box properties
-        boxX, boxY = 767, 582
-        boxWidth, boxHeight = 267, 121
+        lineSurfaces = [render_text(self.stateFont, line, (0, 0, 0)) for line in self.stateText]
 
         # Calculate total height of all lines
         totalHeight = sum(surf.get_height() for surf in lineSurfaces)
-        startY = boxY + (boxHeight - totalHeight) // 2
+        startY = self.stateRect.y + (self.stateRect.height - totalHeight) // 2
 
         # Draw each line centered within the box
         for surf in lineSurfaces:
-            x = boxX + (boxWidth - surf.get_width()) // 2
+            x = self.stateRect.x + (self.stateRect.width - surf.get_width()) // 2
             displayWindow.blit(surf, (x, startY))
             startY += surf.get_height()
     
@@ -337,13 +264,14 @@ class Grid:
             print(row)
     
     def flip_tiles(self, y, x):
-        # Find tiles to flip
-        swappableTilesCoords = find_swappable_tiles(y, x, self.gridLogic, self.currentPlayer)
+        # Tiles to flip, found by switch_player along with the valid moves
+        swappableTilesCoords = self.moveFlips.get((y, x))
 
         if not swappableTilesCoords:
              return
 
         placed_tile_coord = (y, x)
+        self.record.add_move(y, x)
 
         for ty, tx in swappableTilesCoords:
             self.gridLogic[ty][tx] = self.currentPlayer
@@ -386,35 +314,41 @@ class Grid:
     
     def switch_player(self):
         self.currentPlayer = self.playerO if self.currentPlayer == self.playerS else self.playerS
-        self.validMoves = find_valid_moves(self.gridLogic, self.currentPlayer)
+        self.moveFlips = find_move_flips(self.gridLogic, self.currentPlayer)
         
         # Handle Skips
-        if self.validMoves == []:
+        if not self.moveFlips:
             self.stateText = [f"NO VALID MOVE", "TURN SKIPPED"]
             self.currentPlayer = self.playerO if self.currentPlayer == self.playerS else self.playerS
-            self.validMoves = find_valid_moves(self.gridLogic, self.currentPlayer)
+            self.moveFlips = find_move_flips(self.gridLogic, self.currentPlayer)
             
             # Both players skipped
-            if self.validMoves == []:
+            if not self.moveFlips:
                 self.stateText = ["BOTH SKIPPED", "GAME OVER"]    
                 self.bothSkipped = True 
             else:
                 self.stateText = [f"PLAYER {self.currentPlayer}", "TURN"]
+                self.record.add_pass()
         else:
             self.stateText = [f"PLAYER {self.currentPlayer}", "TURN"]
+        self.validMoves = list(self.moveFlips)
         
     def check_game_over(self):
         if self.bothSkipped or self.sScore + self.oScore == self.x * self.y:
             self.gameOver = self.check_winner(self.sScore, self.sPatternScore, self.oScore, self.oPatternScore)
             self.display_game_over()
+            self.save_record()
+
+    def save_record(self):
+        self.record.finish(self)
+        if self.recordPath:
+            try:
+                append_games(self.recordPath, [self.record])
+            except (OSError, ValueError) as e:
+                print(f"Warning: Could not save the game record. Error: {e}")
 
     def check_winner(self, sScore, sPatternScore, oScore, oPatternScore):
-        if (sScore + sPatternScore) > (oScore + oPatternScore):
-            return 1
-        elif (oScore + oPatternScore) > (sScore + sPatternScore):       
-            return 2
-        elif (sScore + sPatternScore) == (oScore + oPatternScore):         
-            return 3
+        return find_winner(sScore, sPatternScore, oScore, oPatternScore)
     
     def display_game_over(self):
         if self.gameOver == 1:
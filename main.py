@@ -1,7 +1,14 @@
+import argparse
+import os
 import pygame
 from grid import Grid, is_on_grid
+from rules import BOARD_SIZE
 from ai_player import ComputerPlayer
+from ai_worker import AISearchWorker
+from opening_book import open_book
 from button import Button
+from render_cache import render_text
+from asset_manager import load_image, load_font
 
 # TODO:
 # Add play again button (after game over) (Done)
@@ -13,7 +20,7 @@ from button import Button
 
 # Handles the Main game loop and grid logic
 class FlipSOS:
-    def __init__(self):
+    def __init__(self, boardSize=BOARD_SIZE, recordPath=None):
         pygame.init()
         pygame.mixer.init()
 
@@ -23,25 +30,12 @@ class FlipSOS:
         self.clock = pygame.time.Clock()
 
         # --- Sound State & Control ---
+        # The music and icons are loaded by load_sound once the first frame is on screen
         self.is_music_on = True
-        try:
-            pygame.mixer.music.load('assets/background_music.mp3')
-            pygame.mixer.music.set_volume(0.2)
-            pygame.mixer.music.play(loops=-1)
-            
-            icon_size = (48, 48)
-            self.sound_on_icon = pygame.image.load('assets/volume-up.png').convert_alpha()
-            self.sound_on_icon = pygame.transform.scale(self.sound_on_icon, icon_size)
-            self.sound_off_icon = pygame.image.load('assets/volume-mute.png').convert_alpha()
-            self.sound_off_icon = pygame.transform.scale(self.sound_off_icon, icon_size)
-            
-            padding = 15
-            self.sound_icon_rect = self.sound_on_icon.get_rect(topleft=(padding, padding))
-
-        except pygame.error as e:
-            print(f"Warning: Could not load assets. Error: {e}")
-            self.sound_on_icon = None
-            self.sound_off_icon = None
+        self.sound_on_icon = None
+        self.sound_off_icon = None
+        padding, icon_size = 15, (48, 48)
+        self.sound_icon_rect = pygame.Rect((padding, padding), icon_size)
 
         # --- Game State & Timers ---
         self.game_state = "HOME"
@@ -50,29 +44,34 @@ class FlipSOS:
         self.is_handling_skip = False
 
         # --- Game Constants ---
-        self.rows = 8
-        self.columns = 8
-        self.tokenSize = (72, 72)
+        self.rows = boardSize
+        self.columns = boardSize
+        tileSize = self.resolution[1] // (boardSize + 2) # The board and its border fill the window's height (72 px tiles on 8x8)
+        self.tokenSize = (tileSize, tileSize)
         self.computerToken = 'O'
         self.playerToken = 'S'
+        self.aiWorkers = max(1, (os.cpu_count() or 1) - 1) # Leave one core for the game loop
+        self.record_path = recordPath # Finished games are appended to this file (see game_record), None to not keep them
+        self.openingBook = open_book() # None when assets/opening_book.bin is missing, the AI then searches every move
 
         self.grid = None
         self.computerPlayer = None
+        self.ai_search = None # Background search of the AI's current move, polled every frame
 
         # --- Fonts & UI ---
         font_path = 'assets/Play-Bold.ttf'
         try:
-            self.title_font = pygame.font.Font(font_path, 96)
-            self.description_font = pygame.font.Font(font_path, 28)
-            self.game_over_font = pygame.font.Font(font_path, 48)
-            self.winner_font = pygame.font.Font(font_path, 36)
+            self.title_font = load_font(font_path, 96)
+            self.description_font = load_font(font_path, 28)
+            self.game_over_font = load_font(font_path, 48)
+            self.winner_font = load_font(font_path, 36)
         except FileNotFoundError:
             print(f"Warning: Font '{font_path}' not found. Falling back to default font.")
             font_path = None
-            self.title_font = pygame.font.Font(font_path, 96)
-            self.description_font = pygame.font.Font(font_path, 28)
-            self.game_over_font = pygame.font.Font(font_path, 48)
-            self.winner_font = pygame.font.Font(font_path, 36)
+            self.title_font = load_font(font_path, 96)
+            self.description_font = load_font(font_path, 28)
+            self.game_over_font = load_font(font_path, 48)
+            self.winner_font = load_font(font_path, 36)
             
         self.home_bg = self.create_home_background()
         
@@ -101,17 +100,36 @@ class FlipSOS:
 
         self.running = True
         self.dt = 0
+        self.frame_rate = 60 # While something is moving, see is_active
+        self.idle_timeout = 500 # Longest wait for an event in ms when nothing is, the loop then runs once anyway
+        self.waited_events = [] # Event that ended the last idle wait, handled by the next input()
 
     def toggle_music(self):
         self.is_music_on = not self.is_music_on
         if self.is_music_on: pygame.mixer.music.unpause()
         else: pygame.mixer.music.pause()
+        if self.grid: self.grid.invalidate(self.sound_icon_rect) # Clear the old icon from the game screen
+
+    def load_sound(self):
+        # Starts the music and loads the icons to toggle it, kept off the startup path (the mp3 is decoded as it plays)
+        try:
+            pygame.mixer.music.load('assets/background_music.mp3')
+            pygame.mixer.music.set_volume(0.2)
+            pygame.mixer.music.play(loops=-1)
+
+            self.sound_on_icon = load_image('assets/volume-up.png', self.sound_icon_rect.size)
+            self.sound_off_icon = load_image('assets/volume-mute.png', self.sound_icon_rect.size)
+
+        except pygame.error as e:
+            print(f"Warning: Could not load assets. Error: {e}")
+            self.sound_on_icon = None
+            self.sound_off_icon = None
 
     def create_home_background(self):
         bg_surface = pygame.Surface(self.resolution)
         bg_surface.fill((20, 20, 30))
         try:
-            tile_img = pygame.image.load('assets/Sprite Sheet.png').convert_alpha()
+            tile_img = load_image('assets/Sprite Sheet.png')
             tile = pygame.transform.scale(tile_img.subsurface((192,0,192,192)), (96, 96))
             tile.set_alpha(30)
             for y in range(0, self.resolution[1], tile.get_height()):
@@ -122,22 +140,51 @@ class FlipSOS:
         return bg_surface
 
     def reset_game(self):
-        self.grid = Grid(self.rows, self.columns, self.tokenSize, self.playerToken, self)
-        self.computerPlayer = ComputerPlayer(self.computerToken, 4, self.grid)
+        self.cancel_ai_search()
+        self.grid = Grid(self.rows, self.columns, self.tokenSize, self.playerToken, self, self.record_path)
+        self.computerPlayer = ComputerPlayer(self.computerToken, 4, self.grid, workers=self.aiWorkers, openingBook=self.openingBook)
         self.game_state = "IN_GAME"
         self.is_handling_skip = False
         self.skip_turn_timer = 0.0
 
+    def cancel_ai_search(self):
+        # Stops the AI's in-flight search (retry, quit), its result belongs to a board that is no longer shown
+        if self.ai_search:
+            self.ai_search.cancel()
+            self.ai_search = None
+
     def handle_skip(self):
         self.is_handling_skip = True
         self.skip_turn_timer = self.skip_turn_duration
 
     def run(self):
+        self.draw() # Show the home screen before anything that isn't needed for it is loaded
+        self.load_sound()
         while self.running:
             self.input()
             self.update()
             self.draw()
-            self.dt = self.clock.tick(60) / 1000.0
+            if self.is_active():
+                self.dt = self.clock.tick(self.frame_rate) / 1000.0
+            else:
+                # Nothing changes until the player does something, sleep until the next event
+                event = pygame.event.wait(self.idle_timeout)
+                if event.type != pygame.NOEVENT: self.waited_events.append(event)
+                self.clock.tick() # The time spent waiting isn't part of any frame
+                self.dt = 0
+        self.cancel_ai_search()
+
+    def is_active(self):
+        # Whether the next frames change without any input: token flips, the skip delay, the AI's turn, button hover fades
+        if self.is_handling_skip:
+            return True
+        if self.game_state == "IN_GAME":
+            return bool(self.grid.animating_tokens) or self.grid.currentPlayer == self.computerToken
+        if self.game_state == "HOME":
+            return self.start_button.is_fading() or self.quit_button.is_fading()
+        if self.game_state == "GAME_OVER":
+            return self.play_again_button.is_fading()
+        return False
 
     def input(self):
         mouse_pos = pygame.mouse.get_pos()
@@ -148,10 +195,15 @@ class FlipSOS:
         elif self.game_state == "GAME_OVER":
             self.play_again_button.check_hover(mouse_pos)
 
-        for event in pygame.event.get():
+        events = self.waited_events + pygame.event.get()
+        self.waited_events = []
+        for event in events:
             if event.type == pygame.QUIT:
                 self.running = False
 
+            if event.type == pygame.WINDOWEXPOSED and self.grid:
+                self.grid.invalidate() # The window's content was lost, draw the whole game screen again
+
             if self.sound_on_icon and self.sound_icon_rect.collidepoint(mouse_pos):
                 if event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
                     self.toggle_music()
@@ -172,13 +224,14 @@ class FlipSOS:
                         grid_row = (y_pixel - self.tokenSize[1]) // self.tokenSize[1]
                         clicked_coord = (grid_row, grid_col)
 
-                        if is_on_grid(grid_row, grid_col) and clicked_coord in self.grid.validMoves:
+                        onGrid = is_on_grid(grid_row, grid_col, maxX=self.rows - 1, maxY=self.columns - 1)
+                        if onGrid and clicked_coord in self.grid.moveFlips:
                             self.grid.lastMove = clicked_coord
                             self.grid.flip_tiles(grid_row, grid_col)
                             if self.grid.switch_player(): self.handle_skip()
                             self.grid.check_game_over()
                             if self.grid.gameOver > 0: self.game_state = "GAME_OVER"
-                        elif is_on_grid(grid_row, grid_col):
+                        elif onGrid:
                             self.grid.stateText = ["INVALID MOVE"]
 
     def update(self):
@@ -196,7 +249,15 @@ class FlipSOS:
 
         if self.game_state == "IN_GAME":
             if self.grid.currentPlayer == self.computerToken and not self.grid.animating_tokens:
-                bestMove = self.computerPlayer.get_best_move_ab()
+                # Search in the background and keep drawing frames until the move is ready
+                if self.ai_search is None:
+                    self.ai_search = AISearchWorker(self.computerPlayer)
+                    return
+                if not self.ai_search.poll():
+                    return
+
+                bestMove = self.ai_search.bestMove
+                self.ai_search = None
                 if bestMove:
                     self.grid.lastMove = bestMove
                     self.grid.flip_tiles(bestMove[0], bestMove[1])
@@ -205,32 +266,42 @@ class FlipSOS:
                 if self.grid.gameOver > 0: self.game_state = "GAME_OVER"
 
     def draw(self):
-        if self.game_state == "HOME": self.draw_home_screen()
-        elif self.game_state == "IN_GAME": self.draw_game_screen()
-        elif self.game_state == "GAME_OVER":
-            self.draw_game_screen()
-            self.draw_game_over_overlay()
-        
-        if self.sound_on_icon:
+        # Only the game screen is drawn incrementally, the other screens are redrawn and pushed whole every frame
+        if self.game_state == "IN_GAME":
+            dirty_rects = self.draw_game_screen()
+        else:
+            if self.game_state == "HOME": self.draw_home_screen()
+            elif self.game_state == "GAME_OVER":
+                self.grid.invalidate() # The overlay is blended over a freshly drawn game screen
+                self.draw_game_screen()
+                self.draw_game_over_overlay()
+            dirty_rects = [self.screen.get_rect()]
+
+        # The icon sits on top of the board's border, draw it again whenever something under it was redrawn
+        if self.sound_on_icon and self.sound_icon_rect.collidelist(dirty_rects) != -1:
+            if self.game_state == "IN_GAME":
+                # The icon is blended over what is under it, which has to be redrawn in full first
+                self.grid.draw_area(self.screen, self.sound_icon_rect)
+                dirty_rects.append(self.sound_icon_rect)
             if self.is_music_on: self.screen.blit(self.sound_on_icon, self.sound_icon_rect)
             else: self.screen.blit(self.sound_off_icon, self.sound_icon_rect)
-        pygame.display.update()
+        pygame.display.update(dirty_rects)
 
     # --- THIS METHOD WAS MISSING ---
     def draw_home_screen(self):
         self.screen.blit(self.home_bg, (0, 0))
 
         # --- Draw Title ---
-        title_text = self.title_font.render("FlipSOS", True, (230, 230, 240))
+        title_text = render_text(self.title_font, "FlipSOS", (230, 230, 240))
         title_rect = title_text.get_rect(center=(self.resolution[0] // 2, self.resolution[1] // 2 - 180))
-        shadow_text = self.title_font.render("FlipSOS", True, (20, 20, 20))
+        shadow_text = render_text(self.title_font, "FlipSOS", (20, 20, 20))
         self.screen.blit(shadow_text, title_rect.move(4, 4))
         self.screen.blit(title_text, title_rect)
 
         # --- Draw Game Description ---
         description_string = "Flip tiles, form SOS patterns, and beat your opponent!"
-        desc_text_surf = self.description_font.render(description_string, True, (200, 200, 220))
-        desc_shadow_surf = self.description_font.render(description_string, True, (20, 20, 20))
+        desc_text_surf = render_text(self.description_font, description_string, (200, 200, 220))
+        desc_shadow_surf = render_text(self.description_font, description_string, (20, 20, 20))
         
         desc_rect = desc_text_surf.get_rect(center=(self.resolution[0] // 2, title_rect.bottom + 80))
 
@@ -242,14 +313,12 @@ class FlipSOS:
         self.quit_button.draw(self.screen)
 
     def draw_game_screen(self):
-        self.screen.fill((255, 255, 255))
-        if self.grid:
-            self.grid.draw_grid(self.screen)
-            self.grid.draw_sidebar(self.screen)
+        # Returns the rectangles that changed since the last frame
+        return self.grid.draw_changes(self.screen) if self.grid else []
 
     def draw_game_over_overlay(self):
         self.screen.blit(self.overlay, (0, 0))
-        game_over_text = self.game_over_font.render("GAME OVER", True, (255, 255, 255))
+        game_over_text = render_text(self.game_over_font, "GAME OVER", (255, 255, 255))
         game_over_rect = game_over_text.get_rect(center=(self.resolution[0]//2, self.resolution[1]//2 - 80))
         self.screen.blit(game_over_text, game_over_rect)
         
@@ -257,12 +326,17 @@ class FlipSOS:
         elif self.grid.gameOver == 2: winner_text = "PLAYER O WINS!"
         else: winner_text = "IT'S A DRAW!"
             
-        winner_surf = self.winner_font.render(winner_text, True, (255, 255, 255))
+        winner_surf = render_text(self.winner_font, winner_text, (255, 255, 255))
         winner_rect = winner_surf.get_rect(center=(self.resolution[0]//2, self.resolution[1]//2 - 20))
         self.screen.blit(winner_surf, winner_rect)
         self.play_again_button.draw(self.screen)
 
 if __name__ == '__main__':
-    game = FlipSOS()
+    parser = argparse.ArgumentParser(description='Play FlipSOS against the computer.')
+    parser.add_argument('--size', type=int, default=BOARD_SIZE, help=f'board size, an even number from 4 to 16 (default: {BOARD_SIZE})')
+    parser.add_argument('--record', metavar='FILE', help='append every finished game to this game record file (see game_record.py)')
+    args = parser.parse_args()
+
+    game = FlipSOS(args.size, args.record)
     game.run()
     pygame.quit()
\ No newline at end of file
@@ -0,0 +1,114 @@
+import mmap
+import os
+import struct
+from bitboard import BOARD_SIZE, grid_to_bitboards, iter_bits
+from transposition import zobrist_hash_bits
+
+# Opening book: best moves of the first plies searched offline (build_book.py), read at runtime through mmap
+# Books cover the standard 8x8 board, positions of other board sizes are never found in them.
+# Positions are keyed by the Zobrist hash of their canonical form, the smallest of the 8 rotations/reflections of the board,
+# so symmetric positions share one entry. Moves are stored in canonical coordinates and mapped back when probing.
+#
+# File layout (little endian):
+#   header  magic (8 bytes), version (u16), search depth (u16), plies (u16), padding (2 bytes), entry count (u32)
+#   entries sorted by key: key (u64), move square (u8), search depth (u8), padding (2 bytes), score (i32)
+# Opening the book only maps the file, lookups binary search the entries in place.
+
+BOOK_PATH = 'assets/opening_book.bin'
+BOOK_MAGIC = b'FSOSBOOK'
+BOOK_VERSION = 1
+HEADER = struct.Struct('<8sHHHxxI')
+ENTRY = struct.Struct('<QBBxxi')
+KEY = struct.Struct('<Q')
+
+# The 8 symmetries of the board as (row, col) -> (row, col), the game rules and pattern lines are the same under all of them
+SYMMETRY_FUNCTIONS = (
+    lambda x, y: (x, y),
+    lambda x, y: (y, 7 - x),
+    lambda x, y: (7 - x, 7 - y),
+    lambda x, y: (7 - y, x),
+    lambda x, y: (x, 7 - y),
+    lambda x, y: (7 - x, y),
+    lambda x, y: (y, x),
+    lambda x, y: (7 - y, 7 - x),
+)
+SYMMETRIES = [[row * 8 + col for row, col in (function(*divmod(square, 8)) for square in range(64))] for function in SYMMETRY_FUNCTIONS]
+INVERSE_SYMMETRIES = [[mapping.index(square) for square in range(64)] for mapping in SYMMETRIES]
+
+def transform_bits(bits, mapping):
+    transformed = 0
+    for square in iter_bits(bits):
+        transformed |= 1 << mapping[square]
+    return transformed
+
+def canonical_position(sBits, oBits):
+    # Returns (sBits, oBits, symmetry index) of the smallest transformed board
+    return min((transform_bits(sBits, mapping), transform_bits(oBits, mapping), index) for index, mapping in enumerate(SYMMETRIES))
+
+def book_key(sBits, oBits, sideToMove, sPatternScore, oPatternScore):
+    # Returns (key, symmetry index), the pattern scores are part of the key since the result of the game depends on them
+    sCanonical, oCanonical, symmetry = canonical_position(sBits, oBits)
+    return zobrist_hash_bits(sCanonical, oCanonical, sideToMove, 0, 0, sPatternScore, oPatternScore), symmetry
+
+def write_book(path, entries, depth, plies):
+    # entries maps key -> (canonical move square, search depth, score)
+    with open(path, 'wb') as bookFile:
+        bookFile.write(HEADER.pack(BOOK_MAGIC, BOOK_VERSION, depth, plies, len(entries)))
+        for key in sorted(entries):
+            square, entryDepth, score = entries[key]
+            bookFile.write(ENTRY.pack(key, square, entryDepth, max(-2 ** 31, min(2 ** 31 - 1, round(score)))))
+
+class OpeningBook:
+    def __init__(self, path):
+        with open(path, 'rb') as bookFile:
+            self.data = mmap.mmap(bookFile.fileno(), 0, access=mmap.ACCESS_READ) # The mapping stays valid after the file is closed
+
+        if len(self.data) < HEADER.size:
+            raise ValueError(f"{path}: not an opening book")
+        magic, version, self.depth, self.plies, self.count = HEADER.unpack_from(self.data, 0)
+        if magic != BOOK_MAGIC or version != BOOK_VERSION or len(self.data) != HEADER.size + self.count * ENTRY.size:
+            raise ValueError(f"{path}: not an opening book (or a different version)")
+
+    def __len__(self):
+        return self.count
+
+    def find(self, key):
+        # Binary search of the sorted entries, returns (canonical move square, depth, score) or None
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            offset = HEADER.size + middle * ENTRY.size
+            middleKey = KEY.unpack_from(self.data, offset)[0]
+            if middleKey < key:
+                low = middle + 1
+            elif middleKey > key:
+                high = middle
+            else:
+                _, square, depth, score = ENTRY.unpack_from(self.data, offset)
+                return square, depth, score
+        return None
+
+    def probe(self, grid, sideToMove, sPatternScore, oPatternScore):
+        # Returns (move, depth, score) for the position, None if it is not in the book
+        if not self.count or len(grid) != BOARD_SIZE:
+            return None
+
+        sBits, oBits = grid_to_bitboards(grid)
+        key, symmetry = book_key(sBits, oBits, sideToMove, sPatternScore, oPatternScore)
+        entry = self.find(key)
+        if entry is None:
+            return None
+
+        square, depth, score = entry
+        return divmod(INVERSE_SYMMETRIES[symmetry][square], 8), depth, score
+
+    def close(self):
+        self.data.close()
+
+openBooks = {} # One mapping per book file for the whole process
+
+def open_book(path=BOOK_PATH):
+    # Returns the shared OpeningBook of path, None if there is no book file
+    if path not in openBooks:
+        openBooks[path] = OpeningBook(path) if os.path.exists(path) else None
+    return openBooks[path]
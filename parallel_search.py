@@ -0,0 +1,132 @@
+import atexit
+import math
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from ai_player import ComputerPlayer, BoardState, SearchPosition, SearchCancelled
+
+# Root-split parallel search
+# The first root move is searched with the full window to get a bound, then the other root moves are tested
+# against the best score so far with a null window in worker processes. Only moves that fail high get a full re-search.
+# The pool is created once and reused for every move so the process spawn cost is only paid once.
+
+POLL_INTERVAL = 0.05 # Seconds between checks for a cancelled search while waiting on the workers
+
+pool = None
+poolWorkers = 0
+cancelEvent = None
+
+# Worker side
+workerPlayers = {} # One ComputerPlayer (and transposition table) per (player, ttSizeMb, weights), kept across jobs
+workerCancelEvent = None
+
+def init_worker(event):
+    global workerCancelEvent
+    workerCancelEvent = event
+
+def search_move_job(player, ttSizeMb, weights, grid, sPatternScore, oPatternScore, move, depth, alpha, beta, timeLeft):
+    # Runs in a worker process: scores one root move of the given position within (alpha, beta)
+    boardState = BoardState(grid, sPatternScore, oPatternScore)
+    computerPlayer = workerPlayers.get((player, ttSizeMb, weights))
+
+    if computerPlayer is None:
+        computerPlayer = ComputerPlayer(player, depth, boardState, ttSizeMb, weights=weights)
+        computerPlayer.cancelEvent = workerCancelEvent
+        workerPlayers[(player, ttSizeMb, weights)] = computerPlayer
+
+    computerPlayer.gridClass = boardState
+    computerPlayer.searchDepth = depth
+    computerPlayer.deadline = None if timeLeft is None else time.perf_counter() + timeLeft
+    computerPlayer.transpositionTable.new_search()
+    computerPlayer.reset_move_ordering(len(grid))
+
+    position = SearchPosition(grid, player, sPatternScore, oPatternScore)
+    return computerPlayer.search_root_move(position, move, alpha, beta)
+
+# Main process side
+def get_pool(workers):
+    # Returns the shared pool, only recreated when a different worker count is asked for
+    global pool, poolWorkers, cancelEvent
+
+    if pool is None or poolWorkers != workers:
+        shutdown_pool()
+        context = multiprocessing.get_context('spawn') # Forking a process that runs SDL and the AI thread is not safe
+        cancelEvent = context.Event()
+        pool = ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=init_worker, initargs=(cancelEvent,))
+        poolWorkers = workers
+
+    return pool
+
+def shutdown_pool():
+    global pool, poolWorkers
+
+    if pool is not None:
+        pool.shutdown(wait=True, cancel_futures=True)
+        pool = None
+        poolWorkers = 0
+
+atexit.register(shutdown_pool)
+
+def abort_jobs(futures):
+    # Stops every job of the current search and waits for the workers to be free again
+    cancelEvent.set()
+    for future in futures:
+        future.cancel()
+    wait(futures)
+    cancelEvent.clear()
+
+def parallel_search_root(computerPlayer, grid, validMoves, depth, firstMove):
+    # Same result as the serial root loop of ComputerPlayer.search_root, including which move wins a tie
+    executor = get_pool(computerPlayer.workers)
+    moves = computerPlayer.order_by_tt_move(validMoves[:], firstMove)
+    gridClass = computerPlayer.gridClass
+    jobArgs = (computerPlayer.player, computerPlayer.ttSizeMb, computerPlayer.weights, grid, gridClass.sPatternScore, gridClass.oPatternScore)
+    pending = {}
+
+    def submit(index, alpha, beta, isTest):
+        timeLeft = None if computerPlayer.deadline is None else computerPlayer.deadline - time.perf_counter()
+        future = executor.submit(search_move_job, *jobArgs, moves[index], depth, alpha, beta, timeLeft)
+        pending[future] = (index, alpha, isTest)
+
+    def bound_for(index):
+        # The serial loop keeps the first of equally scored moves, so a move listed before the current best only needs to tie it
+        return bestScore if index > bestIndex else math.nextafter(bestScore, -math.inf)
+
+    try:
+        # First move with the full window, it gives the bound the other moves are tested against
+        submit(0, -math.inf, math.inf, False)
+        bestIndex = 0
+        bestScore = wait_for_result(computerPlayer, pending)[1]
+
+        nextIndex = 1
+        while nextIndex < len(moves) or pending:
+            # Keep one job per worker so newly submitted tests use the latest bound
+            while nextIndex < len(moves) and len(pending) < computerPlayer.workers:
+                alpha = bound_for(nextIndex)
+                submit(nextIndex, alpha, math.nextafter(alpha, math.inf), True)
+                nextIndex += 1
+
+            (index, alpha, isTest), score = wait_for_result(computerPlayer, pending)
+
+            if score <= alpha:
+                continue # Not better than the bound it was searched against
+            if isTest:
+                submit(index, bound_for(index), math.inf, False) # Failed high, get its exact score
+            elif score > bound_for(index):
+                bestIndex, bestScore = index, score
+    except BaseException:
+        abort_jobs(list(pending))
+        raise
+
+    return moves[bestIndex], bestScore
+
+def wait_for_result(computerPlayer, pending):
+    # Blocks until one job finishes and returns (its job info, its score), raising if the search was cancelled
+    while True:
+        if computerPlayer.cancelled:
+            raise SearchCancelled
+
+        done, _ = wait(pending, timeout=POLL_INTERVAL, return_when=FIRST_COMPLETED)
+        if done:
+            future = done.pop()
+            return pending.pop(future), future.result() # Re-raises SearchTimeout from the worker
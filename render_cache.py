@@ -0,0 +1,16 @@
+# Rendered text surfaces
+# The screens ask for the surface of their strings every time they are drawn, font.render only runs for strings that were
+# not rendered before. Scores keep growing during a game so the cache is emptied when it gets full instead of growing.
+
+MAX_RENDERED_TEXTS = 256
+
+renderedTexts = {} # (font, text, colour) -> surface
+
+def render_text(font, text, colour):
+    key = (font, text, colour)
+    surface = renderedTexts.get(key)
+    if surface is None:
+        if len(renderedTexts) >= MAX_RENDERED_TEXTS:
+            renderedTexts.clear()
+        surface = renderedTexts[key] = font.render(text, True, colour)
+    return surface
@@ -0,0 +1,180 @@
+from copy import copy
+from bitboard import BOARD_SIZE, board_geometry, grid_geometry, grid_to_bitboards, player_bitboards, bits_to_coords, clickable_mask
+from bitboard import valid_moves_mask, move_flips_in_order, flips_in_order, is_pattern, count_patterns
+
+# Game rules on a plain NxN list grid ('S', 'O' or '-' per cell, 8x8 for the standard game), with no pygame dependency
+# The board size is the grid's length, the bitboard tables of that size are looked up from it
+# grid.py draws the game on top of these, the AI and the headless tools (tournament.py) only need this module
+
+def find_valid_directions(x, y, minX=0, minY=0, maxX=BOARD_SIZE - 1, maxY=BOARD_SIZE - 1):
+    # Returns a list of valid directions to move in the grid (Basically, directions that doesn't get out of bounds)
+    validDirections = []
+    
+    if y != minY: validDirections.append((x, y - 1)) # Up
+    if x != maxX and y != minY: validDirections.append((x + 1, y - 1)) # Up-right
+    if x != maxX: validDirections.append((x + 1, y)) # Right
+    if x != maxX and y != maxY: validDirections.append((x + 1, y + 1)) # Down-right
+    if y != maxY: validDirections.append((x, y + 1)) # Down
+    if x != minX and y != maxY: validDirections.append((x - 1, y + 1)) # Down-left
+    if x != minX: validDirections.append((x - 1, y)) # Left
+    if x != minX and y != minY: validDirections.append((x - 1, y - 1)) # Up-left
+                
+    return validDirections
+
+def find_clickable_cells(grid, player):
+    # Clickable cells are those that are empty and have at least one opponent token adjacent to it
+    geometry = grid_geometry(grid)
+    own, opp = player_bitboards(grid, player)
+    return bits_to_coords(clickable_mask(own, opp, geometry), geometry)
+    
+def find_swappable_tiles(x, y, grid, player):
+    # Returns the tiles flipped by placing a token on (x, y), followed by (x, y) itself (empty list if the move is invalid)
+    geometry = grid_geometry(grid)
+    own, opp = player_bitboards(grid, player)
+    swappableTiles = [geometry.coords[square] for square in flips_in_order(own, opp, x * geometry.size + y, geometry)]
+                
+    if len(swappableTiles) > 0:
+        swappableTiles.append((x, y))
+        
+    return swappableTiles
+                
+def find_move_flips(grid, player):
+    # {(x, y): tiles flipped by the move followed by (x, y) itself} of every valid move, the moves in find_valid_moves order
+    # Every move's flips are found in the same pass, keep the result instead of calling find_swappable_tiles per move
+    geometry = grid_geometry(grid)
+    own, opp = player_bitboards(grid, player)
+    coords = geometry.coords
+    return {move: [coords[square] for square in flips] + [move] for move, flips in move_flips_in_order(own, opp, geometry).items()}
+
+def find_valid_moves(grid, player):
+    # Valid move is a cell that is empty and has at least one opponent token adjacent to it, and has at least one swappable tile in the direction of the move
+    geometry = grid_geometry(grid)
+    own, opp = player_bitboards(grid, player)
+    return bits_to_coords(valid_moves_mask(own, opp, geometry), geometry)
+
+def calculate_score(grid):
+    # Calculate the score of each player
+    sScore = 0
+    oScore = 0
+    
+    for row in grid:
+        for cell in row:
+            if cell == 'S':
+                sScore += 1
+            elif cell == 'O':
+                oScore += 1
+        
+    return sScore, oScore
+
+def is_on_grid(x, y, minX=0, minY=0, maxX=BOARD_SIZE - 1, maxY=BOARD_SIZE - 1):
+    # Check if the coordinates are within the grid bounds
+    return minX <= x <= maxX and minY <= y <= maxY
+
+def find_patterns(grid, swappableTiles):
+        # Returns the coordinates of every SOS/OSO line passing through one of the given tiles (used to draw them)
+        geometry = grid_geometry(grid)
+        sBits, oBits = grid_to_bitboards(grid)
+        patterns = []
+        seenPatterns = 0 # Bitmask over pattern line indices, to avoid duplicates
+        
+        for cx, cy in swappableTiles:
+            for index in geometry.linesThrough[cx * geometry.size + cy]:
+                if not seenPatterns >> index & 1 and is_pattern(sBits, oBits, index, geometry):
+                    seenPatterns |= 1 << index
+                    patterns.append(list(geometry.patternLines[index]))
+                            
+        return patterns 
+
+def count_new_patterns(grid, swappableTiles):
+    # Same as len(find_patterns(grid, swappableTiles)) without building any coordinate lists
+    geometry = grid_geometry(grid)
+    sBits, oBits = grid_to_bitboards(grid)
+    changed = 0
+    for x, y in swappableTiles:
+        changed |= 1 << (x * geometry.size + y)
+    return count_patterns(sBits, oBits, changed, geometry)
+
+def new_grid(size=BOARD_SIZE):
+    # Starting position, same tokens as Grid.regen_grid
+    grid = [['-'] * size for _ in range(size)]
+    for (x, y), token in board_geometry(size).startTokens:
+        grid[x][y] = token
+    return grid
+
+def find_winner(sScore, sPatternScore, oScore, oPatternScore):
+    # 1 = S wins, 2 = O wins, 3 = Draw (same codes as Grid.gameOver)
+    if (sScore + sPatternScore) > (oScore + oPatternScore):
+        return 1
+    elif (oScore + oPatternScore) > (sScore + sPatternScore):
+        return 2
+    return 3
+
+# Moves as text: column letter then row number, e.g. (2, 3) is "d3" (and (11, 11) is "l12" on a 12x12 board)
+COLUMN_LETTERS = 'abcdefghijklmnop'
+
+def move_to_text(move):
+    x, y = move
+    return f"{COLUMN_LETTERS[y]}{x + 1}"
+
+def text_to_move(text, size=BOARD_SIZE):
+    text = text.strip().lower()
+    column = COLUMN_LETTERS.find(text[:1])
+    if not 0 <= column < size or not text[1:].isdigit() or not 1 <= int(text[1:]) <= size:
+        raise ValueError(f"Invalid move: {text!r}")
+    return int(text[1:]) - 1, column
+
+# The game logic of Grid (moves, scores, skipped turns, game over) without any drawing, to play games headless
+# It has the gridLogic and pattern score attributes ComputerPlayer reads, so it can be passed as its gridClass
+class GameState:
+    def __init__(self, size=BOARD_SIZE):
+        self.size = size
+        self.gridLogic = new_grid(size)
+        self.currentPlayer = 'S'
+        self.sScore, self.oScore = calculate_score(self.gridLogic)
+        self.sPatternScore, self.oPatternScore = 0, 0
+        self.moveFlips = find_move_flips(self.gridLogic, self.currentPlayer) # Tiles each valid move flips, see find_move_flips
+        self.validMoves = list(self.moveFlips)
+        self.bothSkipped = False
+        self.gameOver = 0 # 0 = Continue, 1 = S wins, 2 = O wins, 3 = Draw
+
+    def copy(self):
+        # Independent copy, to try moves without changing this state
+        state = copy(self)
+        state.gridLogic = [row[:] for row in self.gridLogic]
+        return state
+
+    def play_move(self, x, y):
+        # Same as Grid.flip_tiles followed by switch_player and check_game_over, returns the number of patterns formed
+        swappableTiles = self.moveFlips.get((x, y))
+        if not swappableTiles:
+            raise ValueError(f"Invalid move {move_to_text((x, y))} for player {self.currentPlayer}")
+
+        for tx, ty in swappableTiles:
+            self.gridLogic[tx][ty] = self.currentPlayer
+
+        self.sScore, self.oScore = calculate_score(self.gridLogic)
+        patternScore = count_new_patterns(self.gridLogic, swappableTiles)
+        if self.currentPlayer == 'S':
+            self.sPatternScore += patternScore
+        else:
+            self.oPatternScore += patternScore
+
+        self.switch_player()
+        self.check_game_over()
+        return patternScore
+
+    def switch_player(self):
+        self.currentPlayer = 'O' if self.currentPlayer == 'S' else 'S'
+        self.moveFlips = find_move_flips(self.gridLogic, self.currentPlayer)
+
+        # Handle Skips
+        if not self.moveFlips:
+            self.currentPlayer = 'O' if self.currentPlayer == 'S' else 'S'
+            self.moveFlips = find_move_flips(self.gridLogic, self.currentPlayer)
+            if not self.moveFlips:
+                self.bothSkipped = True
+        self.validMoves = list(self.moveFlips)
+
+    def check_game_over(self):
+        if self.bothSkipped or self.sScore + self.oScore == self.size * self.size:
+            self.gameOver = find_winner(self.sScore, self.sPatternScore, self.oScore, self.oPatternScore)
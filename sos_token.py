@@ -1,5 +1,14 @@
 import pygame
 
+flipFrames = {} # token image -> the image squashed to every width from 0 to its own, shared by all tokens
+
+def flip_frames(image):
+    # Frames of the flip animation of image, indexed by width (the width 0 frame is None, nothing is drawn)
+    if image not in flipFrames:
+        width, height = image.get_size()
+        flipFrames[image] = [None] + [pygame.transform.scale(image, (scaledWidth, height)) for scaledWidth in range(1, width)] + [image]
+    return flipFrames[image]
+
 class Token:
     def __init__(self, player, gridX, gridY, tokenSize, image, s_image, o_image):
         self.player = player
@@ -22,6 +31,10 @@ class Token:
         self.scale_x = 1.0
         self.max_animation_dt = 1 / 30
 
+        # Built once per image, the first token pays for the scaling
+        self.s_frames = flip_frames(s_image)
+        self.o_frames = flip_frames(o_image)
+
     def start_flip_animation(self, target_player):
         if self.player == target_player: 
              return
@@ -58,27 +71,27 @@ class Token:
 
         self.scale_x = max(0.0, min(1.0, self.scale_x))
 
+    def draw_state(self):
+        # (image, width) of what draw() puts on the screen, the grid redraws the token's cell when it changes
+        if self.is_animating:
+            return (self.target_image if self.animation_progress >= 0.5 else self.image), int(self.original_width * self.scale_x)
+        return self.image, self.original_width
+
 
     def draw(self, displayWindow):
         if self.is_animating:
             scaled_width = int(self.original_width * self.scale_x)
-            scaled_height = self.token_height 
 
             if scaled_width <= 0: 
                 return 
 
+            # Select the pre-scaled frame of the side currently shown
             current_image_being_drawn = self.target_image if self.animation_progress >= 0.5 else self.image
-            if self.animation_progress >= 0.5 and self.image != self.target_image:
-                 current_image_being_drawn = self.target_image
-
-            try:
-                scaled_surface = pygame.transform.scale(current_image_being_drawn, (scaled_width, scaled_height))
-            except ValueError:
-                return # Skip drawing if scale failed
+            frames = self.s_frames if current_image_being_drawn is self.s_image else self.o_frames
 
             offset_x = (self.original_width - scaled_width) // 2
             draw_pos_x = self.posX + offset_x
 
-            displayWindow.blit(scaled_surface, (draw_pos_x, self.posY))
+            displayWindow.blit(frames[scaled_width], (draw_pos_x, self.posY))
         else:
             displayWindow.blit(self.image, (self.posX, self.posY))
\ No newline at end of file
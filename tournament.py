@@ -0,0 +1,241 @@
+import argparse
+import math
+import multiprocessing
+import os
+import random
+import time
+from rules import BOARD_SIZE, GameState, move_to_text, text_to_move
+from ai_player import ComputerPlayer, EVAL_WEIGHTS
+from endgame import ENDGAME_EMPTIES
+from opening_book import open_book
+from game_record import GameRecord, play_recorded, append_games
+
+# Headless self-play tournament between two engine settings
+# Every opening is played twice with the colours swapped, games run in parallel on a process pool.
+#
+# Example:
+#   python tournament.py --games 200 --engine-a depth=4 --engine-b "depth=4,weights=50/15/30/80/40/30/60"
+#   python tournament.py --games 100 --engine-a time=200 --engine-b depth=3 --book openings.txt
+#   python tournament.py --games 50 --size 10 --engine-a depth=3 --engine-b depth=2
+#   python tournament.py --games 1000 --engine-a depth=2 --engine-b depth=2 --record games.bin
+#
+# Engine settings are comma separated key=value pairs:
+#   depth    search depth (default 4)
+#   time     time limit per move in ms, the engine then uses iterative deepening instead of a fixed depth
+#   weights  seven evaluation weights separated by '/', same order as ai_player.EVAL_WEIGHTS
+#   tt       transposition table size in MB (default 16)
+#   book     opening book file (see build_book.py), searched moves only by default
+#   endgame  empty squares at which the exact endgame solver takes over (default endgame.ENDGAME_EMPTIES, 0 turns it off)
+# A book file has one opening per line as moves in text notation (e.g. "e6 f4 c3"), lines starting with '#' are skipped.
+
+Z_95 = 1.959964 # Two-sided 95% quantile of the normal distribution
+
+def parse_engine(text):
+    engine = {'depth': 4, 'time': None, 'weights': EVAL_WEIGHTS, 'tt': 16, 'book': None, 'endgame': ENDGAME_EMPTIES}
+
+    for item in filter(None, (part.strip() for part in text.split(','))):
+        key, _, value = item.partition('=')
+        key = key.strip()
+        if key in ('depth', 'time', 'tt', 'endgame'):
+            engine[key] = int(value)
+        elif key == 'weights':
+            weights = tuple(float(weight) for weight in value.split('/'))
+            if len(weights) != len(EVAL_WEIGHTS):
+                raise ValueError(f"Expected {len(EVAL_WEIGHTS)} weights, got {len(weights)}")
+            engine['weights'] = weights
+        elif key == 'book':
+            if open_book(value) is None:
+                raise ValueError(f"Opening book not found: {value}")
+            engine['book'] = value
+        else:
+            raise ValueError(f"Unknown engine setting: {key!r}")
+
+    return engine
+
+def describe_engine(engine):
+    limit = f"time={engine['time']}ms" if engine['time'] is not None else f"depth={engine['depth']}"
+    weights = '' if engine['weights'] == EVAL_WEIGHTS else ' weights=' + '/'.join(f"{weight:g}" for weight in engine['weights'])
+    book = '' if engine['book'] is None else f" book={engine['book']}"
+    endgame = '' if engine['endgame'] == ENDGAME_EMPTIES else f" endgame={engine['endgame']}"
+    return limit + weights + book + endgame
+
+# Openings
+def random_opening(rng, plies, size):
+    # plies random legal moves from the starting position (fewer if the game ends first)
+    state = GameState(size)
+    moves = []
+    while len(moves) < plies and not state.gameOver:
+        move = rng.choice(state.validMoves)
+        state.play_move(*move)
+        moves.append(move)
+    return moves
+
+def load_book(path, size):
+    openings = []
+    with open(path) as bookFile:
+        for lineNumber, line in enumerate(bookFile, 1):
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+
+            state = GameState(size)
+            try:
+                moves = [text_to_move(text, size) for text in line.split()]
+                for move in moves:
+                    state.play_move(*move)
+            except ValueError as e:
+                raise ValueError(f"{path}:{lineNumber}: {e}") from None
+            openings.append(moves)
+
+    if not openings:
+        raise ValueError(f"{path}: no openings")
+    return openings
+
+# Worker side
+def play_game(job):
+    # Plays one game, job is (game index, engine A, engine B, token engine A plays, opening moves, board size)
+    gameIndex, engineA, engineB, tokenA, opening, size = job
+    state = GameState(size)
+    record = GameRecord(size)
+    for move in opening:
+        play_recorded(state, record, *move)
+
+    tokenB = 'O' if tokenA == 'S' else 'S'
+    players = {}
+    for name, engine, token in (('A', engineA, tokenA), ('B', engineB, tokenB)):
+        openingBook = None if engine['book'] is None else open_book(engine['book'])
+        players[token] = (name, ComputerPlayer(token, engine['depth'], state, engine['tt'], engine['time'], weights=engine['weights'], openingBook=openingBook, endgameEmpties=engine['endgame']))
+
+    stats = {'A': [0, 0.0, 0.0], 'B': [0, 0.0, 0.0]} # nodes, total seconds, slowest move seconds
+    moves = {'A': 0, 'B': 0}
+    while not state.gameOver:
+        name, computerPlayer = players[state.currentPlayer]
+        start = time.perf_counter()
+        move = computerPlayer.get_best_move_ab()
+        elapsed = time.perf_counter() - start
+
+        engineStats = stats[name]
+        engineStats[0] += computerPlayer.nodes
+        engineStats[1] += elapsed
+        engineStats[2] = max(engineStats[2], elapsed)
+        moves[name] += 1
+        play_recorded(state, record, *move)
+    record.finish(state)
+
+    if state.gameOver == 3:
+        scoreA = 0.5
+    else:
+        winner = 'S' if state.gameOver == 1 else 'O'
+        scoreA = 1.0 if winner == tokenA else 0.0
+
+    return {
+        'game': gameIndex,
+        'tokenA': tokenA,
+        'opening': ' '.join(move_to_text(move) for move in opening),
+        'scoreA': scoreA,
+        'final': (state.sScore, state.sPatternScore, state.oScore, state.oPatternScore),
+        'stats': stats,
+        'moves': moves,
+        'record': record,
+    }
+
+# Main process side
+def elo_from_score(score):
+    if score <= 0:
+        return -math.inf
+    if score >= 1:
+        return math.inf
+    return -400 * math.log10(1 / score - 1)
+
+def elo_difference(wins, draws, losses):
+    # Elo difference of A over B and the half width of its 95% confidence interval
+    games = wins + draws + losses
+    score = (wins + 0.5 * draws) / games
+    variance = (wins * (1 - score) ** 2 + draws * (0.5 - score) ** 2 + losses * score ** 2) / games
+    margin = Z_95 * math.sqrt(variance / games)
+    low, high = elo_from_score(score - margin), elo_from_score(score + margin)
+    if math.isinf(low) or math.isinf(high):
+        return elo_from_score(score), math.inf # Not enough decisive results either way to bound it
+    return elo_from_score(score), (high - low) / 2
+
+def make_jobs(engineA, engineB, games, openings, size):
+    # Game 2k and 2k + 1 share an opening, engine A plays S in the first and O in the second
+    jobs = []
+    for gameIndex in range(games):
+        opening = openings[gameIndex // 2 % len(openings)]
+        jobs.append((gameIndex, engineA, engineB, 'S' if gameIndex % 2 == 0 else 'O', opening, size))
+    return jobs
+
+def print_report(engineA, engineB, results, wallTime):
+    wins = sum(1 for result in results if result['scoreA'] == 1.0)
+    draws = sum(1 for result in results if result['scoreA'] == 0.5)
+    losses = len(results) - wins - draws
+    elo, margin = elo_difference(wins, draws, losses)
+    score = (wins + 0.5 * draws) / len(results)
+
+    print()
+    print(f"Engine A: {describe_engine(engineA)}")
+    print(f"Engine B: {describe_engine(engineB)}")
+    print(f"Games: {len(results)}   W/D/L (A): {wins}/{draws}/{losses}   Score: {100 * score:.1f}%")
+    print(f"Elo difference (A - B): {elo:+.1f} +/- {margin:.1f} (95%)")
+
+    for name in ('A', 'B'):
+        nodes = sum(result['stats'][name][0] for result in results)
+        seconds = sum(result['stats'][name][1] for result in results)
+        slowest = max(result['stats'][name][2] for result in results)
+        moves = sum(result['moves'][name] for result in results)
+        nodesPerSecond = nodes / seconds if seconds else 0
+        latency = 1000 * seconds / moves if moves else 0
+        print(f"Engine {name}: {nodesPerSecond:,.0f} nodes/s   {latency:.1f} ms/move avg   {1000 * slowest:.1f} ms/move max   {moves} moves")
+
+    print(f"Wall time: {wallTime:.1f} s   Throughput: {3600 * len(results) / wallTime:,.0f} games/hour")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Play two FlipSOS engine settings against each other.')
+    parser.add_argument('--engine-a', '-a', default='depth=4', help='settings of engine A (default: depth=4)')
+    parser.add_argument('--engine-b', '-b', default='depth=3', help='settings of engine B (default: depth=3)')
+    parser.add_argument('--games', '-n', type=int, default=100, help='number of games, rounded up to an even number (default: 100)')
+    parser.add_argument('--workers', '-j', type=int, default=os.cpu_count(), help='games played at the same time (default: all cores)')
+    parser.add_argument('--random-plies', type=int, default=4, help='random moves played before the engines take over (default: 4)')
+    parser.add_argument('--book', help='file of openings to play instead of random ones')
+    parser.add_argument('--seed', type=int, help='seed for the random openings')
+    parser.add_argument('--size', type=int, default=BOARD_SIZE, help=f'board size, an even number from 4 to 16 (default: {BOARD_SIZE})')
+    parser.add_argument('--record', metavar='FILE', help='append every game to this game record file (see game_record.py)')
+    args = parser.parse_args(argv)
+
+    try:
+        engineA, engineB = parse_engine(args.engine_a), parse_engine(args.engine_b)
+        games = max(2, args.games + args.games % 2)
+        GameState(args.size) # Rejects unsupported sizes before any game starts
+        if args.record:
+            append_games(args.record, []) # Creates the file, or checks it is a game record file
+        if args.book:
+            openings = load_book(args.book, args.size)
+        else:
+            rng = random.Random(args.seed)
+            openings = [random_opening(rng, args.random_plies, args.size) for _ in range(games // 2)]
+    except (OSError, ValueError) as e:
+        parser.error(str(e))
+
+    jobs = make_jobs(engineA, engineB, games, openings, args.size)
+    workers = max(1, min(args.workers, games))
+    board = '' if args.size == BOARD_SIZE else f" on a {args.size}x{args.size} board"
+    print(f"Playing {games} games{board} on {workers} processes: A = {describe_engine(engineA)}, B = {describe_engine(engineB)}")
+
+    results = []
+    progressStep = max(1, games // 20)
+    startTime = time.perf_counter()
+    with multiprocessing.Pool(workers) as pool:
+        for result in pool.imap_unordered(play_game, jobs):
+            results.append(result)
+            if args.record:
+                append_games(args.record, [result['record']])
+            if len(results) % progressStep == 0 or len(results) == games:
+                wins = sum(1 for result in results if result['scoreA'] == 1.0)
+                draws = sum(1 for result in results if result['scoreA'] == 0.5)
+                print(f"  {len(results)}/{games} games   W/D/L (A): {wins}/{draws}/{len(results) - wins - draws}", flush=True)
+
+    print_report(engineA, engineB, results, time.perf_counter() - startTime)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,111 @@
+import random
+from bitboard import MAX_BOARD_SIZE
+
+# Zobrist hashing and transposition table for the alpha-beta search
+# A position key is the XOR of one random 64-bit number per (square, token), one for the side to move
+# and one per accumulated pattern score of each player, so every move can update it incrementally.
+
+EXACT, LOWER, UPPER = 0, 1, 2 # Bound type of a stored score
+ENTRY_BYTES = 160 # Rough size of one entry (list slot + tuple + ints), used to turn a megabyte cap into a slot count
+
+zobristRandom = random.Random(20240501) # Fixed seed so keys are the same between runs
+S_KEYS = [zobristRandom.getrandbits(64) for _ in range(64)]
+O_KEYS = [zobristRandom.getrandbits(64) for _ in range(64)]
+FLIP_KEYS = [sKey ^ oKey for sKey, oKey in zip(S_KEYS, O_KEYS)] # Turns an S token into an O token (and back)
+SIDE_KEY = zobristRandom.getrandbits(64) # Present when 'O' is to move
+S_PATTERN_KEYS = [zobristRandom.getrandbits(64) for _ in range(64)] # Indexed by pattern score gained during the search
+O_PATTERN_KEYS = [zobristRandom.getrandbits(64) for _ in range(64)]
+S_BASE_KEYS = [zobristRandom.getrandbits(64) for _ in range(64)] # Indexed by the pattern score before the search started
+O_BASE_KEYS = [zobristRandom.getrandbits(64) for _ in range(64)]
+
+# Squares past the 64 of the standard board (larger boards), drawn last so the keys of 8x8 positions stay the same
+S_KEYS += [zobristRandom.getrandbits(64) for _ in range(64, MAX_BOARD_SIZE * MAX_BOARD_SIZE)]
+O_KEYS += [zobristRandom.getrandbits(64) for _ in range(64, MAX_BOARD_SIZE * MAX_BOARD_SIZE)]
+FLIP_KEYS += [sKey ^ oKey for sKey, oKey in zip(S_KEYS[64:], O_KEYS[64:])]
+
+# Utility Functions
+def score_key(keys, score):
+    # Pattern scores have no fixed upper bound, so keys past the pregenerated ones are added the first time they are needed
+    while len(keys) <= score:
+        keys.append(zobristRandom.getrandbits(64))
+    return keys[score]
+
+def zobrist_hash(grid, sideToMove, sPatternScore=0, oPatternScore=0, sBaseScore=0, oBaseScore=0):
+    # Full hash of a position, the search only calls this once at the root and updates it incrementally afterwards
+    key = (score_key(S_PATTERN_KEYS, sPatternScore) ^ score_key(O_PATTERN_KEYS, oPatternScore) ^
+           score_key(S_BASE_KEYS, sBaseScore) ^ score_key(O_BASE_KEYS, oBaseScore))
+
+    size = len(grid)
+    for x, row in enumerate(grid):
+        for y, cell in enumerate(row):
+            if cell == 'S':
+                key ^= S_KEYS[x * size + y]
+            elif cell == 'O':
+                key ^= O_KEYS[x * size + y]
+
+    if sideToMove == 'O':
+        key ^= SIDE_KEY
+
+    return key
+
+def zobrist_hash_bits(sBits, oBits, sideToMove, sPatternScore=0, oPatternScore=0, sBaseScore=0, oBaseScore=0):
+    # zobrist_hash of a position given as bitboards
+    key = (score_key(S_PATTERN_KEYS, sPatternScore) ^ score_key(O_PATTERN_KEYS, oPatternScore) ^
+           score_key(S_BASE_KEYS, sBaseScore) ^ score_key(O_BASE_KEYS, oBaseScore))
+
+    while sBits:
+        low = sBits & -sBits
+        key ^= S_KEYS[low.bit_length() - 1]
+        sBits ^= low
+    while oBits:
+        low = oBits & -oBits
+        key ^= O_KEYS[low.bit_length() - 1]
+        oBits ^= low
+
+    if sideToMove == 'O':
+        key ^= SIDE_KEY
+
+    return key
+
+def update_pattern_hash(key, player, oldScore, newScore):
+    # Swaps the pattern score component of player in the hash
+    patternKeys = S_PATTERN_KEYS if player == 'S' else O_PATTERN_KEYS
+    return key ^ score_key(patternKeys, oldScore) ^ score_key(patternKeys, newScore)
+
+# Fixed-size hash table of search results with a depth-preferred replacement policy
+class TranspositionTable:
+    def __init__(self, sizeMb=16):
+        # Round the slot count down to a power of two so a key can be mapped to a slot with a mask
+        slots = max(1, (sizeMb * 1024 * 1024) // ENTRY_BYTES)
+        self.size = 1 << (slots.bit_length() - 1)
+        self.mask = self.size - 1
+        self.entries = [None] * self.size
+        self.generation = 0 # Bumped for every new root search so entries of older searches can be replaced
+        self.probes = 0
+        self.hits = 0
+
+    def new_search(self):
+        self.generation += 1
+
+    def clear(self):
+        self.entries = [None] * self.size
+        self.generation = 0
+
+    def probe(self, key):
+        # Returns (depth, bound, score, bestMove) of the stored entry or None
+        self.probes += 1
+        entry = self.entries[key & self.mask]
+
+        if entry is None or entry[0] != key:
+            return None
+
+        self.hits += 1
+        return entry[2], entry[3], entry[4], entry[5]
+
+    def store(self, key, depth, bound, score, bestMove):
+        # Keep the deeper result when a slot is already used, unless the stored one comes from an older search
+        index = key & self.mask
+        entry = self.entries[index]
+
+        if entry is None or entry[1] != self.generation or depth >= entry[2]:
+            self.entries[index] = (key, self.generation, depth, bound, score, bestMove)
@@ -0,0 +1,197 @@
+import argparse
+import json
+import time
+import numpy as np
+import batch_eval
+from bitboard import BOARD_SIZE
+from ai_player import EVAL_WEIGHTS, VALUE_TABLE, WEIGHTS_PATH
+from game_record import GameRecords, replay
+
+# Tunes the evaluation weights and value table on recorded games (see game_record.py, e.g. tournament.py --record)
+# Every position before a move of every finished 8x8 game is labelled with the result of the game for the player to
+# move (1 win, 0.5 draw, 0 loss). The evaluation terms of all positions are computed with batch_eval in chunks of NumPy
+# arrays, then a logistic regression of the labels on the terms is fitted with mini-batch Adam steps.
+#
+# The evaluation is linear in its weights, so the fitted coefficients are the weights: the positional value of each
+# square class (squares at the same distance from the edges, in either order) and the weights of the other terms.
+# The corner term counts the same tokens as the corner entries of the value table, they can't be told apart, so the fit
+# folds it into the table and writes 0 for it. The table is scaled to integers up to 100 and all weights are scaled so
+# the evaluation keeps the range of the current one (far below the win reward of the search).
+#
+# Examples:
+#   python tournament.py --games 20000 --engine-a depth=2 --engine-b depth=2 --random-plies 8 --record games.bin
+#   python tune_weights.py games.bin   (writes assets/eval_weights.json, ComputerPlayer loads it when imported)
+
+def ring(index):
+    return min(index, BOARD_SIZE - 1 - index)
+
+# Square classes of the value table: (ring of the row, ring of the column) in either order
+SQUARE_CLASSES = sorted({tuple(sorted((ring(row), ring(col)))) for row in range(BOARD_SIZE) for col in range(BOARD_SIZE)})
+CLASS_MATRIX = np.zeros((BOARD_SIZE * BOARD_SIZE, len(SQUARE_CLASSES)), dtype=np.int64) # Square -> one-hot class
+for square in range(BOARD_SIZE * BOARD_SIZE):
+    row, col = divmod(square, BOARD_SIZE)
+    CLASS_MATRIX[square, SQUARE_CLASSES.index(tuple(sorted((ring(row), ring(col)))))] = 1
+
+TERM_NAMES = ('tokens', 'frontier', 'mobility', 'corner closeness', 'patterns')
+FEATURE_NAMES = tuple(f"value {a},{b}" for a, b in SQUARE_CLASSES) + TERM_NAMES
+
+CHUNK_POSITIONS = 1 << 16 # Positions converted to boards at once, bounds the memory of the (N, 64) arrays
+
+def load_positions(paths, skipPlies):
+    # Returns (own bits, opp bits, own pattern scores, opp pattern scores, labels, game numbers) of every position,
+    # from the point of view of the player to move
+    ownBits, oppBits, ownPatterns, oppPatterns, labels, games = [], [], [], [], [], []
+    gameNumber = 0
+    for path in paths:
+        records = GameRecords(path)
+        for record in records:
+            if record.size != BOARD_SIZE or not record.result:
+                continue
+            winner = {1: 'S', 2: 'O'}.get(record.result) # None for a draw
+            for ply, (sBits, oBits, player, sPatternScore, oPatternScore, _) in enumerate(replay(record)):
+                if ply < skipPlies:
+                    continue
+                if player == 'S':
+                    ownBits.append(sBits), oppBits.append(oBits), ownPatterns.append(sPatternScore), oppPatterns.append(oPatternScore)
+                else:
+                    ownBits.append(oBits), oppBits.append(sBits), ownPatterns.append(oPatternScore), oppPatterns.append(sPatternScore)
+                labels.append(0.5 if winner is None else float(player == winner))
+                games.append(gameNumber)
+            gameNumber += 1
+        records.close()
+
+    return (np.array(ownBits, dtype=np.uint64), np.array(oppBits, dtype=np.uint64), np.array(ownPatterns, dtype=np.int64),
+            np.array(oppPatterns, dtype=np.int64), np.array(labels), np.array(games))
+
+def feature_matrix(ownBits, oppBits, ownPatterns, oppPatterns):
+    # (N, len(FEATURE_NAMES)) matrix of the evaluation terms, and the current evaluation of every position
+    features = np.empty((len(ownBits), len(FEATURE_NAMES)))
+    currentScores = np.empty(len(ownBits))
+    for start in range(0, len(ownBits), CHUNK_POSITIONS):
+        end = start + CHUNK_POSITIONS
+        boards = batch_eval.bitboards_to_boards(ownBits[start:end], oppBits[start:end])
+        staticValue, tokenDiff, frontier, mobility, cornerScore, cornerAdj = batch_eval.feature_terms(boards)
+
+        own, opp = ownPatterns[start:end], oppPatterns[start:end]
+        patternTotal = own + opp
+        patternScoreDiff = np.where(patternTotal == 0, 0, 100 * (own - opp) / np.maximum(patternTotal, 1))
+
+        features[start:end, :len(SQUARE_CLASSES)] = boards.astype(np.int64) @ CLASS_MATRIX # Own minus opponent tokens per class
+        features[start:end, len(SQUARE_CLASSES):] = np.column_stack((tokenDiff, frontier, mobility, cornerAdj, patternScoreDiff))
+        currentScores[start:end] = batch_eval.evaluate_boards(boards, own, opp, EVAL_WEIGHTS)
+    return features, currentScores
+
+def sigmoid(values):
+    return 1 / (1 + np.exp(-np.clip(values, -60, 60)))
+
+def log_loss(probabilities, labels):
+    probabilities = np.clip(probabilities, 1e-12, 1 - 1e-12)
+    return float(-np.mean(labels * np.log(probabilities) + (1 - labels) * np.log(1 - probabilities)))
+
+def fit(features, labels, train, validation, epochs, batchSize, learningRate, l2, rng):
+    # Logistic regression without intercept (the terms are symmetric between the players), Adam on standardised features
+    scale = np.sqrt(np.mean(features[train] ** 2, axis=0))
+    scale[scale == 0] = 1
+    scaled = features / scale
+    coefficients = np.zeros(features.shape[1])
+    firstMoment, secondMoment = np.zeros_like(coefficients), np.zeros_like(coefficients)
+    beta1, beta2, step = 0.9, 0.999, 0
+
+    for epoch in range(epochs):
+        order = rng.permutation(train)
+        for start in range(0, len(order), batchSize):
+            batch = order[start:start + batchSize]
+            errors = sigmoid(scaled[batch] @ coefficients) - labels[batch]
+            gradient = scaled[batch].T @ errors / len(batch) + l2 * coefficients
+
+            step += 1
+            firstMoment = beta1 * firstMoment + (1 - beta1) * gradient
+            secondMoment = beta2 * secondMoment + (1 - beta2) * gradient ** 2
+            coefficients -= learningRate * (firstMoment / (1 - beta1 ** step)) / (np.sqrt(secondMoment / (1 - beta2 ** step)) + 1e-8)
+
+        trainLoss = log_loss(sigmoid(scaled[train] @ coefficients), labels[train])
+        validationLoss = log_loss(sigmoid(scaled[validation] @ coefficients), labels[validation]) if len(validation) else float('nan')
+        print(f"  epoch {epoch + 1}/{epochs}   train loss {trainLoss:.4f}   validation loss {validationLoss:.4f}", flush=True)
+
+    return coefficients / scale
+
+def evaluation_bound(weights, valueTable):
+    # Largest evaluation the weights can give (see the score ranges in ComputerPlayer.heuristic_evaluation)
+    wStatic, wTokens, wFrontier, wMobility, wCorners, wCornerAdj, wPatterns = weights
+    staticBound = sum(abs(value) for row in valueTable for value in row)
+    return abs(wStatic) * staticBound + 100 * (abs(wTokens) + abs(wFrontier) + abs(wMobility) + abs(wCorners) + abs(wPatterns)) + 150 * abs(wCornerAdj)
+
+def to_evaluation(coefficients):
+    # (weights, valueTable) of fitted coefficients, scaled to the range of the current evaluation
+    classValues = coefficients[:len(SQUARE_CLASSES)]
+    wStatic = max(np.abs(classValues).max() / 100, 1e-12)
+    tableByClass = [int(round(value / wStatic)) for value in classValues]
+    valueTable = [[tableByClass[SQUARE_CLASSES.index(tuple(sorted((ring(row), ring(col)))))] for col in range(BOARD_SIZE)] for row in range(BOARD_SIZE)]
+
+    wTokens, wFrontier, wMobility, wCornerAdj, wPatterns = coefficients[len(SQUARE_CLASSES):]
+    weights = (wStatic, wTokens, wFrontier, wMobility, 0.0, wCornerAdj, wPatterns)
+    factor = evaluation_bound(EVAL_WEIGHTS, VALUE_TABLE) / evaluation_bound(weights, valueTable)
+    return tuple(round(float(weight * factor), 3) for weight in weights), valueTable
+
+def accuracy(scores, labels):
+    # Share of decided positions where the sign of the score agrees with the result
+    decided = labels != 0.5
+    return float(np.mean((scores[decided] > 0) == (labels[decided] == 1))) if decided.any() else float('nan')
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Tune the FlipSOS evaluation on recorded games.')
+    parser.add_argument('inputs', nargs='+', help='game record files')
+    parser.add_argument('--output', '-o', default=WEIGHTS_PATH, help=f'weights file (default: {WEIGHTS_PATH})')
+    parser.add_argument('--skip-plies', type=int, default=4, help='leave out the first plies of every game (default: 4)')
+    parser.add_argument('--validation', type=float, default=0.1, help='share of games held out to check the fit (default: 0.1)')
+    parser.add_argument('--epochs', type=int, default=20, help='passes over the training positions (default: 20)')
+    parser.add_argument('--batch-size', type=int, default=4096, help='positions per gradient step (default: 4096)')
+    parser.add_argument('--learning-rate', type=float, default=0.02, help='Adam step size (default: 0.02)')
+    parser.add_argument('--l2', type=float, default=1e-4, help='L2 penalty on the standardised coefficients (default: 1e-4)')
+    parser.add_argument('--seed', type=int, default=0, help='seed of the validation split and batch order (default: 0)')
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    try:
+        ownBits, oppBits, ownPatterns, oppPatterns, labels, games = load_positions(args.inputs, args.skip_plies)
+    except (OSError, ValueError) as e:
+        parser.error(str(e))
+    if not len(labels):
+        parser.error(f"no positions of finished {BOARD_SIZE}x{BOARD_SIZE} games in the input")
+    print(f"Loaded {len(labels):,} positions of {games[-1] + 1:,} games in {time.perf_counter() - start:.1f} s", flush=True)
+
+    start = time.perf_counter()
+    features, currentScores = feature_matrix(ownBits, oppBits, ownPatterns, oppPatterns)
+    print(f"Extracted {features.shape[1]} features in {time.perf_counter() - start:.1f} s", flush=True)
+
+    # Whole games are held out, positions of one game are too alike to check the fit on each other
+    rng = np.random.default_rng(args.seed)
+    heldOut = rng.random(games[-1] + 1) < args.validation
+    validation = np.flatnonzero(heldOut[games])
+    train = np.flatnonzero(~heldOut[games])
+
+    start = time.perf_counter()
+    coefficients = fit(features, labels, train, validation, args.epochs, args.batch_size, args.learning_rate, args.l2, rng)
+    print(f"Fitted in {time.perf_counter() - start:.1f} s")
+
+    weights, valueTable = to_evaluation(coefficients)
+    tunedScores = features @ coefficients
+    checked = validation if len(validation) else train
+    print(f"Validation accuracy: current evaluation {100 * accuracy(currentScores[checked], labels[checked]):.1f}%, "
+          f"tuned {100 * accuracy(tunedScores[checked], labels[checked]):.1f}%")
+    print("Weights: " + '/'.join(f"{weight:g}" for weight in weights))
+    for row in valueTable:
+        print('  ' + ' '.join(f"{value:4d}" for value in row))
+
+    with open(args.output, 'w') as weightsFile:
+        json.dump({
+            'weights': weights,
+            'valueTable': valueTable,
+            'positions': int(len(labels)),
+            'games': int(games[-1] + 1),
+            'validationLoss': log_loss(sigmoid(features[validation] @ coefficients), labels[validation]) if len(validation) else None,
+        }, weightsFile, indent=1)
+    print(f"Wrote {args.output}")
+
+if __name__ == '__main__':
+    main()